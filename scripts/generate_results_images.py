@@ -1,9 +1,12 @@
-from PIL import Image, ImageDraw, ImageFont
+# PIL, o pool de processos e o diretório de saída só entram no primeiro uso:
+# importar o módulo (ex.: para reaproveitar `images`) não tem efeitos colaterais
+import hashlib
+import io
+import json
 import textwrap
 import os
 
 OUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'resultados')
-os.makedirs(OUT_DIR, exist_ok=True)
 
 images = {
     'v1-PR1.jpg': '''V1 - PR1 (pr_valido.json)
@@ -133,44 +136,326 @@ Recomendações: Registrar incidente; bloquear CI até verificação.
 }
 
 
-def render_text_to_jpeg(text, out_path, width=1200, padding=40, bg=(255,255,255), fg=(0,0,0)):
-    font_path = None
-    try:
-        font = ImageFont.truetype("DejaVuSans.ttf", 18)
-    except Exception:
-        font = ImageFont.load_default()
+FONT_NAME = 'DejaVuSans.ttf'
+FONT_SIZE = 18
+MANIFEST_NAME = 'manifest.json'
+
+# Fonte carregada uma vez por processo (no worker, pelo initializer do pool)
+_font = None
+
 
+def get_font():
+    global _font
+    if _font is None:
+        from PIL import ImageFont
+        try:
+            _font = ImageFont.truetype(FONT_NAME, FONT_SIZE)
+        except Exception:
+            _font = ImageFont.load_default()
+    return _font
+
+
+def wrap_lines(text, columns=90):
     lines = []
     for paragraph in text.split('\n'):
-        wrapped = textwrap.wrap(paragraph, width=90)
+        wrapped = textwrap.wrap(paragraph, width=columns)
         if not wrapped:
             lines.append('')
         else:
             lines.extend(wrapped)
+    return lines
 
+
+def line_height(font):
     try:
         ascent, descent = font.getmetrics()
-        line_height = ascent + descent + 6
+        return ascent + descent + 6
     except Exception:
-        line_height = 20 + 6
-    img_height = padding*2 + line_height * (len(lines) + 1)
-    img = Image.new('RGB', (width, img_height), color=bg)
+        return 20 + 6
+
+
+def card_size(text, width=1200, padding=40):
+    # Altura calculada sem renderizar (usada para montar o sprite sheet)
+    return width, padding*2 + line_height(get_font()) * (len(wrap_lines(text)) + 1)
+
+
+def render_text_image(text, width=1200, padding=40, bg=(255,255,255), fg=(0,0,0)):
+    from PIL import Image, ImageDraw
+    font = get_font()
+    lines = wrap_lines(text)
+    step = line_height(font)
+    img = Image.new('RGB', card_size(text, width, padding), color=bg)
     draw = ImageDraw.Draw(img)
 
     y = padding
     x = padding
     for line in lines:
         draw.text((x, y), line, font=font, fill=fg)
-        y += line_height
+        y += step
+    return img
 
-    img.save(out_path, quality=90)
 
+def render_text_to_jpeg(text, out_path, width=1200, padding=40, bg=(255,255,255), fg=(0,0,0)):
+    render_text_image(text, width, padding, bg, fg).save(out_path, quality=90)
+
+
+# ========================================
+# ENTRADAS
+# ========================================
+
+def slugify(label):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+
+
+def card_file_name(name):
+    # Nome de arquivo seguro dentro de --out-dir: sem diretórios, só [A-Za-z0-9_-] e .jpg
+    stem = os.path.basename(name.replace('\\', '/'))
+    if stem.lower().endswith('.jpg'):
+        stem = stem[:-4]
+    return (slugify(stem) or '_') + '.jpg'
+
+
+def card_from_record(record):
+    # Registros do relatório JSONL (test_prompt_injection.py --format jsonl)
+    if record.get('type') == 'execution':
+        name = f"{record['prompt_version'].lower()}-{record['id']}.jpg"
+        text = (f"{record['prompt_version']} - {record['id']} ({record['name']})\n\n"
+                f"Tipo de Ataque: {record['attack_type']}\n"
+                f"Severidade: {record['severity']}\n"
+                f"Detectado: {'SIM' if record['detected'] else 'NÃO'}\n\n"
+                f"{record['explanation']}\n\n"
+                f"Resultado: {record['result']}\n")
+        return name, text
+    # Registros da varredura em massa (security_tests/bulk_scan.py)
+    if 'versions' in record and 'path' in record:
+        label = record.get('pr_id') or os.path.basename(record['path'])
+        slug = slugify(label)
+        lines = [f"{label} ({record['path']})", '']
+        for version, verdict in record['versions'].items():
+            lines.append(f"{version}: {verdict['explanation']}")
+        lines += ['', f"Resultado: {'BLOQUEADO' if record['blocked'] else 'APROVADO'}"]
+        return f"{slug}-{record['sha256'][:8]}.jpg", '\n'.join(lines) + '\n'
+    # Formato direto: {"name": ..., "text": ...}
+    if 'name' in record and 'text' in record:
+        return record['name'], record['text']
+    return None
+
+
+def iter_cards(paths):
+    # Lê JSONL (uma análise por linha) ou um objeto JSON {nome: texto}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            first = f.read(1)
+            f.seek(0)
+            if first == '{' and path.endswith('.json'):
+                for name, text in json.load(f).items():
+                    yield name, text
+                continue
+            for line in f:
+                line = line.strip()
+                if line:
+                    card = card_from_record(json.loads(line))
+                    if card is not None:
+                        yield card
+
+
+# ========================================
+# RENDERIZAÇÃO EM PARALELO COM MANIFESTO
+# ========================================
+
+def content_hash(text):
+    params = f'{FONT_NAME}:{FONT_SIZE}:1200:40:90'
+    return hashlib.sha256((params + '\0' + text).encode('utf-8')).hexdigest()
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-def main():
-    for name, text in images.items():
-        out_path = os.path.join(OUT_DIR, name)
-        print('Generating', out_path)
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _render_batch(jobs):
+    rendered = []
+    for name, out_path, text, digest in jobs:
         render_text_to_jpeg(text, out_path)
+        rendered.append((name, digest))
+    return rendered
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def render_all(cards, out_dir=OUT_DIR, workers=0, chunk_size=16, force=False):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    jobs = []
+    skipped = 0
+    for name, text in cards:
+        # O mesmo nome seguro é o arquivo gerado e a chave do manifesto
+        name = card_file_name(name)
+        digest = content_hash(text)
+        out_path = os.path.join(out_dir, name)
+        if not force and manifest.get(name) == digest and os.path.exists(out_path):
+            skipped += 1
+            continue
+        jobs.append((name, out_path, text, digest))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= chunk_size:
+        results = [_render_batch(jobs)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=get_font)
+        with pool:
+            results = list(pool.map(_render_batch, _chunks(jobs, chunk_size)))
+    for batch in results:
+        for name, digest in batch:
+            print('Generating', os.path.join(out_dir, name))
+            manifest[name] = digest
+    save_manifest(out_dir, manifest)
+    return len(jobs), skipped
+
+
+# ========================================
+# SAÍDA ÚNICA: PDF MULTIPÁGINA / SPRITE SHEET
+# ========================================
+
+class StreamingPDF:
+    # PDF mínimo com uma imagem JPEG (DCTDecode) por página, gravado à medida
+    # que as páginas chegam; só os offsets dos objetos ficam em memória
+
+    def __init__(self, out):
+        self.out = out
+        self.offsets = []
+        self.pages = []
+        self.position = 0
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        # Objetos 1 (catálogo) e 2 (árvore de páginas) são gravados no close()
+        self.offsets = [None, None]
+
+    def _write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+
+    def _object(self, body, stream=None):
+        self.offsets.append(self.position)
+        number = len(self.offsets)
+        data = f'{number} 0 obj\n'.encode() + body
+        if stream is not None:
+            data += b'\nstream\n' + stream + b'\nendstream'
+        self._write(data + b'\nendobj\n')
+        return number
+
+    def add_page(self, jpeg, width, height):
+        image = self._object(
+            f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+            f'/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode '
+            f'/Length {len(jpeg)} >>'.encode(), jpeg)
+        content = f'q {width} 0 0 {height} 0 0 cm /Im0 Do Q'.encode()
+        contents = self._object(f'<< /Length {len(content)} >>'.encode(), content)
+        page = self._object(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] '
+            f'/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {contents} 0 R >>'.encode())
+        self.pages.append(page)
+
+    def close(self):
+        kids = ' '.join(f'{page} 0 R' for page in self.pages)
+        for number, body in ((1, '<< /Type /Catalog /Pages 2 0 R >>'),
+                             (2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>')):
+            self.offsets[number - 1] = self.position
+            self._write(f'{number} 0 obj\n{body}\nendobj\n'.encode())
+        xref = self.position
+        lines = [f'xref\n0 {len(self.offsets) + 1}\n', '0000000000 65535 f \n']
+        lines += [f'{offset:010d} 00000 n \n' for offset in self.offsets]
+        lines.append(f'trailer\n<< /Size {len(self.offsets) + 1} /Root 1 0 R >>\n'
+                     f'startxref\n{xref}\n%%EOF\n')
+        self._write(''.join(lines).encode())
+
+
+def _render_page(text):
+    img = render_text_image(text)
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue(), img.width, img.height
+
+
+def _pages(cards, workers):
+    texts = (text for _, text in cards)
+    if workers == 1:
+        return map(_render_page, texts)
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=get_font)
+    # O pool é encerrado quando o gerador termina
+    def generate():
+        with pool:
+            yield from pool.map(_render_page, texts, chunksize=8)
+    return generate()
+
+
+def write_pdf(cards, out_path, workers=0):
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with open(out_path, 'wb') as f:
+        pdf = StreamingPDF(f)
+        for jpeg, width, height in _pages(cards, workers):
+            pdf.add_page(jpeg, width, height)
+            count += 1
+        pdf.close()
+    return count
+
+
+def write_sprite(cards, out_path, columns=4, scale=0.25, workers=0):
+    # Cada cartão vira uma miniatura em uma grade de células de mesmo tamanho
+    from PIL import Image
+    cards = list(cards)
+    if not cards:
+        return 0
+    workers = workers or os.cpu_count() or 1
+    cell_w = int(1200 * scale)
+    cell_h = int(max(card_size(text)[1] for _, text in cards) * scale)
+    rows = (len(cards) + columns - 1) // columns
+    sheet = Image.new('RGB', (cell_w * columns, cell_h * rows), color=(255, 255, 255))
+    for index, (jpeg, width, height) in enumerate(_pages(cards, workers)):
+        thumb = Image.open(io.BytesIO(jpeg))
+        thumb = thumb.resize((int(width * scale), int(height * scale)))
+        sheet.paste(thumb, ((index % columns) * cell_w, (index // columns) * cell_h))
+    sheet.save(out_path, quality=90)
+    return len(cards)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Gera os cartões de resultado em JPEG')
+    parser.add_argument('inputs', nargs='*',
+                        help='Análises em JSONL (relatório --format jsonl, bulk_scan) ou JSON {nome: texto}')
+    parser.add_argument('--out-dir', default=OUT_DIR)
+    parser.add_argument('--workers', type=int, default=0, help='Processos (0 = todos os núcleos)')
+    parser.add_argument('--force', action='store_true', help='Ignora o manifesto e regera tudo')
+    parser.add_argument('--pdf', metavar='PATH', help='Grava um único PDF multipágina em vez de JPEGs')
+    parser.add_argument('--sprite', metavar='PATH', help='Grava um sprite sheet em vez de JPEGs')
+    parser.add_argument('--columns', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    cards = iter_cards(args.inputs) if args.inputs else iter(images.items())
+    if args.pdf:
+        print(f'{write_pdf(cards, args.pdf, args.workers)} páginas em {args.pdf}')
+    elif args.sprite:
+        print(f'{write_sprite(cards, args.sprite, args.columns, workers=args.workers)} cartões em {args.sprite}')
+    else:
+        rendered, skipped = render_all(cards, args.out_dir, args.workers, force=args.force)
+        print(f'{rendered} gerados, {skipped} inalterados (manifesto)')
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Detecção de Anomalias (camada 2 da V3)
+Entropia de Shannon em janelas deslizantes e histogramas de classes de
+caracteres calculados com NumPy sobre a visão em bytes do payload, sem
+laço Python por caractere. Aceita lotes de payloads em uma única chamada
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_WINDOW = 64
+DEFAULT_STEP = 16
+DEFAULT_THRESHOLD = 5.2        # bits/byte; texto e HCL ficam abaixo de ~5.0
+DEFAULT_DENSE_THRESHOLD = 4.5  # limite para janelas quase só com alfabeto Base64
+DENSE_RATIO = 0.9
+WINDOWS_PER_BLOCK = 4096
+CLASS_BLOCK = 1 << 16  # bincount converte cada fatia para int64
+
+CHAR_CLASSES = ["lower", "upper", "digit", "b64_symbol", "space", "punct", "control", "non_ascii"]
+_DENSE_CLASSES = [0, 1, 2, 3]
+
+
+def _class_table() -> np.ndarray:
+    table = np.full(256, CHAR_CLASSES.index("non_ascii"), dtype=np.uint8)
+    for code in range(128):
+        ch = chr(code)
+        if ch.islower():
+            name = "lower"
+        elif ch.isupper():
+            name = "upper"
+        elif ch.isdigit():
+            name = "digit"
+        elif ch in "+/=":
+            name = "b64_symbol"
+        elif ch in " \t\r\n":
+            name = "space"
+        elif code < 32 or code == 127:
+            name = "control"
+        else:
+            name = "punct"
+        table[code] = CHAR_CLASSES.index(name)
+    return table
+
+
+_CLASS_OF = _class_table()
+
+
+@dataclass(frozen=True)
+class AnomalyRegion:
+    """Região de entropia alta (offsets em bytes UTF-8)"""
+    start: int
+    end: int
+    max_entropy: float
+
+
+@dataclass
+class AnomalyReport:
+    """Resultado da camada de anomalias para um payload"""
+    size: int
+    max_entropy: float
+    mean_entropy: float
+    class_histogram: Dict[str, int]
+    regions: List[AnomalyRegion]
+
+    @property
+    def anomalous(self) -> bool:
+        return bool(self.regions)
+
+
+def _gather(values: np.ndarray, starts: np.ndarray, width: int) -> np.ndarray:
+    """Matriz (janelas x width) com os bytes de cada janela"""
+    return values[starts[:, None] + np.arange(width)[None, :]]
+
+
+def _entropy(windows: np.ndarray) -> np.ndarray:
+    """Entropia de Shannon por linha: log2(w) - sum(c * log2(c)) / w
+
+    Cada linha é ordenada e as contagens c saem do comprimento das
+    sequências de bytes iguais, sem histograma de 256 posições por janela
+    """
+    count, width = windows.shape
+    flat = np.sort(windows, axis=1, kind="stable").ravel()  # radix sort para uint8
+    run_start = np.ones(len(flat), dtype=bool)
+    run_start[1:] = flat[1:] != flat[:-1]
+    run_start[::width] = True
+    starts = np.flatnonzero(run_start)
+    lengths = np.diff(np.append(starts, len(flat)))
+    c_log_c = lengths * np.log2(lengths)
+    total = np.bincount(starts // width, weights=c_log_c, minlength=count)
+    return np.maximum(np.log2(width) - total / width, 0.0)
+
+
+def _block_stats(data: np.ndarray, starts: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Entropia e nº de bytes do alfabeto Base64 de um bloco de janelas"""
+    windows = _gather(data, starts, width)
+    dense = (_CLASS_OF[windows] <= _DENSE_CLASSES[-1]).sum(axis=1)
+    return _entropy(windows), dense
+
+
+def _class_histogram(data: np.ndarray, start: int, size: int) -> np.ndarray:
+    """Contagem por classe de caractere, em fatias de CLASS_BLOCK bytes"""
+    counts = np.zeros(len(CHAR_CLASSES), dtype=np.int64)
+    for first in range(start, start + size, CLASS_BLOCK):
+        segment = data[first:min(first + CLASS_BLOCK, start + size)]
+        counts += np.bincount(_CLASS_OF[segment], minlength=len(CHAR_CLASSES))
+    return counts
+
+
+def _window_starts(length: int, window: int, step: int) -> Iterator[np.ndarray]:
+    """Inícios das janelas de um payload, em blocos de até WINDOWS_PER_BLOCK"""
+    last = length - window
+    count = last // step + 1
+    for first in range(0, count, WINDOWS_PER_BLOCK):
+        yield np.arange(first, min(count, first + WINDOWS_PER_BLOCK), dtype=np.int64) * step
+    if (count - 1) * step != last:
+        yield np.array([last], dtype=np.int64)
+
+
+def _regions(starts: np.ndarray, flagged: np.ndarray, entropy: np.ndarray,
+             width: int, regions: List[AnomalyRegion]) -> None:
+    """Une janelas marcadas que se sobrepõem às regiões já encontradas"""
+    for i in np.flatnonzero(flagged):
+        start, end, value = int(starts[i]), int(starts[i]) + width, float(entropy[i])
+        if regions and start <= regions[-1].end:
+            last = regions[-1]
+            regions[-1] = AnomalyRegion(last.start, max(last.end, end), max(last.max_entropy, value))
+        else:
+            regions.append(AnomalyRegion(start, end, value))
+
+
+class _Totals:
+    """Acumulado das janelas de um payload entre blocos"""
+    __slots__ = ("max", "sum", "count", "regions")
+
+    def __init__(self):
+        self.max = 0.0
+        self.sum = 0.0
+        self.count = 0
+        self.regions: List[AnomalyRegion] = []
+
+
+def score_batch(payloads: Sequence[str], window: int = DEFAULT_WINDOW, step: int = DEFAULT_STEP,
+                threshold: float = DEFAULT_THRESHOLD,
+                dense_threshold: float = DEFAULT_DENSE_THRESHOLD) -> List[AnomalyReport]:
+    """Calcula entropia, histogramas e regiões de um lote inteiro de uma vez
+
+    Uma janela é marcada se sua entropia passa de threshold, ou de
+    dense_threshold quando ao menos DENSE_RATIO dela é alfabeto Base64.
+    As janelas de todos os payloads são processadas juntas em blocos de
+    WINDOWS_PER_BLOCK: além dos bytes do lote, a memória é limitada
+    """
+    encoded = [p.encode("utf-8", "surrogatepass") for p in payloads]
+    lengths = [len(blob) for blob in encoded]
+    offsets = [0] * len(encoded)
+    for n in range(1, len(encoded)):
+        offsets[n] = offsets[n - 1] + lengths[n - 1]
+    # Um único payload não é copiado (join devolve o próprio objeto)
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    del encoded
+
+    totals: Dict[int, _Totals] = {}
+    pending: List[Tuple[int, np.ndarray]] = []
+    pending_count = 0
+
+    def flush() -> None:
+        # Janelas de vários payloads em uma passada (nenhuma cruza a fronteira entre dois)
+        starts = np.concatenate([local + offsets[n] for n, local in pending])
+        entropy, dense = _block_stats(data, starts, window)
+        flagged = (entropy > threshold) | ((entropy > dense_threshold) & (dense >= DENSE_RATIO * window))
+        first = 0
+        for n, local in pending:
+            last = first + len(local)
+            values = entropy[first:last]
+            total = totals[n]
+            total.max = max(total.max, float(values.max()))
+            total.sum += float(values.sum())
+            total.count += len(values)
+            _regions(local, flagged[first:last], values, window, total.regions)
+            first = last
+        pending.clear()
+
+    reports: List[Optional[AnomalyReport]] = [None] * len(lengths)
+    histograms = [_class_histogram(data, offsets[n], size) for n, size in enumerate(lengths)]
+    for n, size in enumerate(lengths):
+        if size >= window:
+            totals[n] = _Totals()
+            for local in _window_starts(size, window, step):
+                pending.append((n, local))
+                pending_count += len(local)
+                if pending_count >= WINDOWS_PER_BLOCK:
+                    flush()
+                    pending_count = 0
+    if pending:
+        flush()
+
+    for n, size in enumerate(lengths):
+        histogram = {name: int(histograms[n][k]) for k, name in enumerate(CHAR_CLASSES)}
+        if n in totals:
+            total = totals[n]
+            reports[n] = AnomalyReport(int(size), total.max, total.sum / total.count,
+                                       histogram, total.regions)
+        elif size:
+            # Payloads menores que a janela viram uma única janela do próprio tamanho
+            value = float(_entropy(data[offsets[n]:offsets[n] + size][None, :])[0])
+            dense_share = histograms[n][_DENSE_CLASSES].sum() / size
+            mark = value > threshold or (value > dense_threshold and dense_share >= DENSE_RATIO)
+            regions = [AnomalyRegion(0, int(size), value)] if mark else []
+            reports[n] = AnomalyReport(int(size), value, value, histogram, regions)
+        else:
+            reports[n] = AnomalyReport(0, 0.0, 0.0, histogram, [])
+    return reports
+
+
+def char_spans(payload: str, regions: Sequence[AnomalyRegion]) -> List[Tuple[int, int]]:
+    """Regiões em offsets de caractere do payload (bordas no meio de um
+    caractere multibyte o incluem inteiro)"""
+    if payload.isascii():
+        return [(region.start, region.end) for region in regions]
+    codes = np.frombuffer(payload.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    # Offset em bytes UTF-8 do início de cada caractere (e o total no fim)
+    offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(1 + (codes >= 0x80) + (codes >= 0x800) + (codes >= 0x10000), out=offsets[1:])
+    bounds = np.array([(region.start, region.end) for region in regions], dtype=np.int64).reshape(-1, 2)
+    starts = np.searchsorted(offsets, bounds[:, 0], side="right") - 1
+    ends = np.searchsorted(offsets, bounds[:, 1], side="left")
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def score(payload: str, window: int = DEFAULT_WINDOW, step: int = DEFAULT_STEP,
+          threshold: float = DEFAULT_THRESHOLD,
+          dense_threshold: float = DEFAULT_DENSE_THRESHOLD) -> AnomalyReport:
+    """Atalho para um único payload"""
+    return score_batch([payload], window, step, threshold, dense_threshold)[0]
+
+
+def main() -> int:
+    from attack_corpus import iter_corpus
+
+    parser = argparse.ArgumentParser(description="Pontua a entropia de um corpus JSONL em lotes")
+    parser.add_argument("corpus", help="Corpus JSONL (.gz aceito, '-' = stdin)")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--step", type=int, default=DEFAULT_STEP)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    records = iter_corpus(args.corpus)
+    total = flagged = 0
+    while True:
+        batch = list(islice(records, args.batch_size))
+        if not batch:
+            break
+        reports = score_batch([r["payload"] for r in batch], args.window, args.step, args.threshold)
+        for record, report in zip(batch, reports):
+            total += 1
+            if report.anomalous:
+                flagged += 1
+                spans = ", ".join(f"{r.start}-{r.end} ({r.max_entropy:.2f})" for r in report.regions)
+                print(f"{record['id']}: {spans}")
+    print(f"{flagged} de {total} payloads com regiões de entropia alta", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
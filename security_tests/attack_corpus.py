@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Corpus de Ataques
+Gera variantes de payloads a partir de seeds aplicando operadores de
+mutação (encodings, caixa, espaços/homóglifos, divisão de keywords),
+grava em JSONL (opcionalmente gzip) e lê os registros sob demanda
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import random
+import re
+import sys
+from itertools import chain
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+Record = Dict[str, str]
+
+# Letras latinas e equivalentes visuais (cirílico / fullwidth)
+HOMOGLYPHS = {
+    "A": "АＡ", "B": "ВＢ", "C": "СＣ", "E": "ЕＥ", "H": "НＨ", "I": "ІＩ",
+    "K": "КＫ", "M": "МＭ", "O": "ОＯ", "P": "РＰ", "S": "ЅＳ", "T": "ТＴ",
+    "X": "ХＸ", "Y": "УＹ", "a": "а", "c": "с", "e": "е", "o": "о",
+    "p": "р", "s": "ѕ", "x": "х", "y": "у", "i": "і",
+}
+ZERO_WIDTH = ["\u200b", "\u200c", "\u200d", "\u2060"]
+
+
+# ========================================
+# OPERADORES DE MUTAÇÃO
+# ========================================
+
+def _keyword_regex(keywords: Sequence[str]) -> "re.Pattern":
+    ordered = sorted(keywords, key=len, reverse=True)
+    return re.compile("|".join(re.escape(k) for k in ordered), re.IGNORECASE)
+
+
+def _attack_lines(payload: str, finder: "re.Pattern") -> List[int]:
+    return [i for i, line in enumerate(payload.split("\n")) if finder.search(line)]
+
+
+def _rewrite_keywords(payload: str, finder: "re.Pattern", rng: random.Random,
+                      transform: Callable[[str, random.Random], str]) -> str:
+    return finder.sub(lambda m: transform(m.group(), rng), payload)
+
+
+def mutate_casing(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Alterna maiúsculas/minúsculas dentro das keywords"""
+    return _rewrite_keywords(payload, finder, rng, lambda k, r: "".join(
+        ch.upper() if r.random() < 0.5 else ch.lower() for ch in k))
+
+
+def mutate_whitespace(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Insere espaços extras e caracteres de largura zero nas keywords"""
+    def transform(keyword: str, r: random.Random) -> str:
+        out = []
+        for ch in keyword:
+            out.append(ch)
+            if ch == " ":
+                out.append(r.choice([" ", "\t", "  "]))
+            elif r.random() < 0.3:
+                out.append(r.choice(ZERO_WIDTH))
+        return "".join(out)
+    return _rewrite_keywords(payload, finder, rng, transform)
+
+
+def mutate_homoglyph(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Troca letras das keywords por homóglifos unicode"""
+    return _rewrite_keywords(payload, finder, rng, lambda k, r: "".join(
+        r.choice(HOMOGLYPHS[ch]) if ch in HOMOGLYPHS and r.random() < 0.4 else ch for ch in k))
+
+
+def mutate_split_lines(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Quebra as keywords entre linhas de comentário"""
+    def transform(keyword: str, r: random.Random) -> str:
+        cut = r.randint(1, max(1, len(keyword) - 1))
+        return f"{keyword[:cut]}\n# {keyword[cut:]}"
+    return _rewrite_keywords(payload, finder, rng, transform)
+
+
+def mutate_split_variables(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Move as linhas de ataque para locals concatenados"""
+    lines = payload.split("\n")
+    targets = _attack_lines(payload, finder)
+    if not targets:
+        return payload
+    parts = []
+    for n, index in enumerate(targets):
+        text = lines[index].lstrip("#/* ").replace('"', "'")
+        cut = rng.randint(1, max(1, len(text) - 1))
+        parts.append(f'  p{n}a = "{text[:cut]}"\n  p{n}b = "{text[cut:]}"')
+        lines[index] = ""
+    locals_block = "locals {\n" + "\n".join(parts) + "\n}"
+    return "\n".join(lines) + "\n\n" + locals_block
+
+
+def _encode_lines(payload: str, finder: "re.Pattern", encode: Callable[[str], str]) -> str:
+    lines = payload.split("\n")
+    for index in _attack_lines(payload, finder):
+        lines[index] = "# " + encode(lines[index].lstrip("#/* "))
+    return "\n".join(lines)
+
+
+def mutate_base64(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Codifica as linhas de ataque em Base64 (uma ou duas camadas)"""
+    def encode(text: str) -> str:
+        data = text.encode("utf-8")
+        for _ in range(rng.randint(1, 2)):
+            data = base64.b64encode(data)
+        return data.decode()
+    return _encode_lines(payload, finder, encode)
+
+
+def mutate_hex(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Codifica as linhas de ataque em hexadecimal"""
+    prefix = rng.choice(["", "0x"])
+    return _encode_lines(payload, finder, lambda t: prefix + t.encode("utf-8").hex())
+
+
+def mutate_url(payload: str, finder: "re.Pattern", rng: random.Random) -> str:
+    """Codifica as linhas de ataque em URL-encoding"""
+    return _encode_lines(payload, finder, lambda t: quote(t, safe=""))
+
+
+MUTATIONS: Dict[str, Tuple[Callable[[str, "re.Pattern", random.Random], str], Optional[str]]] = {
+    # nome: (operador, attack_type resultante; None mantém o da seed)
+    "casing": (mutate_casing, None),
+    "whitespace": (mutate_whitespace, "escape_sequence"),
+    "homoglyph": (mutate_homoglyph, "escape_sequence"),
+    "split_lines": (mutate_split_lines, "prompt_smuggling"),
+    "split_variables": (mutate_split_variables, "prompt_smuggling"),
+    "base64": (mutate_base64, "base64_encoding"),
+    "hex": (mutate_hex, "base64_encoding"),
+    "url": (mutate_url, "base64_encoding"),
+}
+
+
+# ========================================
+# GERAÇÃO E ARMAZENAMENTO
+# ========================================
+
+def generate_variants(seeds: Sequence[Record], keywords: Sequence[str], count: int,
+                      max_ops: int = 2, seed: int = 0,
+                      operators: Optional[Sequence[str]] = None) -> Iterator[Record]:
+    """Gera `count` variantes sob demanda (nada é acumulado em memória)"""
+    rng = random.Random(seed)
+    finder = _keyword_regex(keywords)
+    names = list(operators or MUTATIONS)
+    for n in range(count):
+        base = seeds[n % len(seeds)]
+        ops = rng.sample(names, rng.randint(1, min(max_ops, len(names))))
+        payload = base["payload"]
+        attack_type = base["attack_type"]
+        for name in ops:
+            operator, new_type = MUTATIONS[name]
+            payload = operator(payload, finder, rng)
+            attack_type = new_type or attack_type
+        yield {
+            **base,
+            "id": f"{base['id']}-M{n:07d}",
+            "name": f"{base['name']} [{'+'.join(ops)}]",
+            "attack_type": attack_type,
+            "payload": payload,
+            "attack_description": f"{base['attack_description']} (mutações: {', '.join(ops)})",
+        }
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path == "-":
+        return sys.stdout if "w" in mode else sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_corpus(path: str, records: Iterable[Record]) -> int:
+    """Grava registros em JSONL (gzip se o arquivo terminar em .gz)"""
+    total = 0
+    f = _open(path, "w")
+    try:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            total += 1
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return total
+
+
+def iter_corpus(path: str) -> Iterator[Record]:
+    """Lê os registros de um corpus JSONL um a um"""
+    f = _open(path, "r")
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main() -> int:
+    # Import tardio: o módulo de testes só é necessário para obter as seeds
+    from test_prompt_injection import PromptValidator, TEST_CASES, case_to_record
+
+    parser = argparse.ArgumentParser(description="Gera um corpus de variantes de ataques")
+    parser.add_argument("output", help="Arquivo JSONL de saída (.gz para compactar, '-' = stdout)")
+    parser.add_argument("--count", type=int, default=10000, help="Número de variantes")
+    parser.add_argument("--seeds", help="Corpus JSONL usado como seed (padrão: TEST_CASES)")
+    parser.add_argument("--max-ops", type=int, default=2, help="Máximo de mutações por variante")
+    parser.add_argument("--operators", nargs="*", choices=list(MUTATIONS), help="Operadores permitidos")
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--include-seeds", action="store_true", help="Inclui as seeds no corpus")
+    args = parser.parse_args()
+
+    seeds = list(iter_corpus(args.seeds)) if args.seeds else [case_to_record(c) for c in TEST_CASES]
+    variants = generate_variants(seeds, PromptValidator.MALICIOUS_KEYWORDS, args.count,
+                                 args.max_ops, args.random_seed, args.operators)
+    records = chain(seeds, variants) if args.include_seeds else variants
+
+    total = write_corpus(args.output, records)
+    print(f"{total} registros gravados em {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
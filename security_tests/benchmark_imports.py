@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Tempo de Import
+Importa cada módulo em um processo novo com `python -X importtime`, mede a
+mediana do tempo acumulado e compara com o orçamento. Também verifica que o
+import não tem efeitos colaterais: nenhuma dependência pesada carregada
+(NumPy, PIL, pool de processos), nenhum dado montado e nada gravado em disco
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportTarget(NamedTuple):
+    """Módulo medido, orçamento (ms) e o que não pode acontecer no import"""
+    module: str
+    directory: str
+    budget_ms: float
+    forbidden: Tuple[str, ...]
+    lazy: Tuple[str, ...] = ()
+
+
+TARGETS: List[ImportTarget] = [
+    ImportTarget("test_prompt_injection", os.path.join(ROOT, "security_tests"), 100.0,
+                 ("numpy", "anomaly_detector", "attack_corpus", "concurrent.futures.process"),
+                 ("_test_cases",)),
+    ImportTarget("generate_results_images", os.path.join(ROOT, "scripts"), 40.0,
+                 ("PIL", "concurrent.futures.process")),
+]
+
+# Executado no processo filho: audita gravações durante o import e lista
+# os módulos proibidos carregados e os atributos preguiçosos já montados
+_PROBE = """
+import json, os, sys
+directory, module, forbidden, lazy = json.loads(sys.argv[1])
+writes = []
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT
+
+def audit(event, args):
+    if event in ("os.mkdir", "os.rename", "os.remove", "os.rmdir"):
+        writes.append(f"{event} {args[0]}")
+    elif event == "open" and not isinstance(args[0], int):
+        mode, flags = args[1], args[2]
+        if (mode and any(c in mode for c in "wax+")) or (mode is None and flags & WRITE_FLAGS):
+            writes.append(f"open {args[0]}")
+
+sys.path.insert(0, directory)
+sys.addaudithook(audit)
+imported = __import__(module)
+print(json.dumps({
+    "loaded": sorted(name for name in forbidden if name in sys.modules),
+    "built": sorted(name for name in lazy if getattr(imported, name, None) is not None),
+    "writes": writes,
+}))
+"""
+
+
+def _run(args: List[str], directory: str, cwd: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=directory, PYTHONDONTWRITEBYTECODE="1")
+    return subprocess.run([sys.executable, "-B", *args], cwd=cwd, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def import_time_ms(target: ImportTarget, cwd: str) -> float:
+    """Tempo acumulado (ms) do import do módulo, lido da saída de -X importtime"""
+    result = _run(["-X", "importtime", "-c", f"import {target.module}"], target.directory, cwd)
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == target.module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"{target.module} não aparece na saída de -X importtime")
+
+
+def probe(target: ImportTarget, cwd: str) -> Dict:
+    """Efeitos colaterais do import (módulos proibidos, dados montados, gravações)"""
+    payload = json.dumps([target.directory, target.module, target.forbidden, target.lazy])
+    return json.loads(_run(["-c", _PROBE, payload], target.directory, cwd).stdout)
+
+
+def measure(target: ImportTarget, repeats: int) -> Dict:
+    """Mediana do tempo de import (após um aquecimento) e problemas encontrados"""
+    with tempfile.TemporaryDirectory() as cwd:
+        # Aquecimento: caches do sistema de arquivos e .pyc já existentes
+        import_time_ms(target, cwd)
+        samples = [import_time_ms(target, cwd) for _ in range(repeats)]
+        side_effects = probe(target, cwd)
+        leftovers = os.listdir(cwd)
+
+    median = statistics.median(samples)
+    problems = []
+    if median > target.budget_ms:
+        problems.append(f"{median:.1f} ms acima do orçamento de {target.budget_ms:.0f} ms")
+    for name in side_effects["loaded"]:
+        problems.append(f"importa {name}")
+    for name in side_effects["built"]:
+        problems.append(f"monta {name} no import")
+    for write in side_effects["writes"] + [f"criou {name}" for name in leftovers]:
+        problems.append(f"grava em disco: {write}")
+    return {
+        "module": target.module,
+        "median_ms": round(median, 2),
+        "min_ms": round(min(samples), 2),
+        "max_ms": round(max(samples), 2),
+        "budget_ms": target.budget_ms,
+        "problems": problems,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de import dos módulos")
+    parser.add_argument("--repeats", type=int, default=7, help="Imports medidos por módulo")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULO=MS",
+                        help="Substitui o orçamento de um módulo (pode repetir)")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for item in args.budget:
+        module, _, value = item.partition("=")
+        overrides[module] = float(value)
+    targets = [target._replace(budget_ms=overrides.get(target.module, target.budget_ms))
+               for target in TARGETS]
+
+    results = [measure(target, args.repeats) for target in targets]
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print(f"{'Módulo':<26} {'Mediana':>9} {'Mín':>9} {'Máx':>9} {'Orçamento':>10}")
+        for result in results:
+            status = "OK" if not result["problems"] else "FALHOU"
+            print(f"{result['module']:<26} {result['median_ms']:>7.1f}ms {result['min_ms']:>7.1f}ms "
+                  f"{result['max_ms']:>7.1f}ms {result['budget_ms']:>8.0f}ms  {status}")
+            for problem in result["problems"]:
+                print(f"    - {problem}")
+    return 1 if any(result["problems"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Varredura em Massa
+Percorre diretórios (terraform_examples/, pr_samples/ ou um repositório
+inteiro), lê cada arquivo via mmap, agrupa arquivos idênticos pelo hash e
+distribui apenas os conteúdos únicos em um pool de processos. Emite um
+veredicto por arquivo .tf e por documento de PR, em JSONL
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pr_documents import document_payload, parse_versions
+
+DEFAULT_INCLUDE = ["*.tf", "*.tfvars", "*.json"]
+SKIP_DIRS = {".git", ".terraform", "node_modules", "__pycache__", ".venv", "venv"}
+HASH_CHUNK = 256
+SCAN_CHUNK = 32
+
+KIND_TERRAFORM = "terraform"
+KIND_PR = "pr"
+KIND_SKIPPED = "skipped"
+
+
+def iter_files(roots: Sequence[str], include: Sequence[str]) -> Iterator[str]:
+    """Caminhos dos arquivos que casam com `include`, em ordem estável"""
+    for root in roots:
+        if os.path.isfile(root):
+            yield root
+            continue
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.path)
+                elif entry.is_file() and any(fnmatch.fnmatch(entry.name, p) for p in include):
+                    yield entry.path
+            stack.extend(reversed(subdirs))
+
+
+def _read_text(path: str) -> str:
+    """Texto do arquivo decodificado direto do mmap, sem cópia em bytes
+
+    Arquivos vazios não podem ser mapeados
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return str(view, "utf-8", errors="replace")
+
+
+def _hash_files(paths: List[str]) -> List[Tuple[str, int, Optional[str]]]:
+    """Worker: (caminho, tamanho, sha256) de cada arquivo"""
+    hashed = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    digest = hashlib.sha256(b"").hexdigest()
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        digest = hashlib.sha256(mm).hexdigest()
+            hashed.append((path, size, digest))
+        except OSError:
+            hashed.append((path, 0, None))
+    return hashed
+
+
+def classify_document(path: str, text: str) -> Tuple[str, str, str]:
+    """Retorna (tipo, id, código); JSON sem campo de código é ignorado"""
+    if path.endswith(".json"):
+        try:
+            document = json.loads(text)
+        except ValueError:
+            # Arquivos .json com HCL puro (como pr_samples/pr_complexo.json)
+            return KIND_TERRAFORM, "", text
+        if isinstance(document, dict):
+            try:
+                item_id, payload = document_payload(document)
+                return KIND_PR, item_id, payload
+            except ValueError:
+                pass
+        return KIND_SKIPPED, "", ""
+    return KIND_TERRAFORM, "", text
+
+
+def _scan_files(items: List[Tuple[str, str]], versions: Sequence[str]) -> List[Tuple[str, Dict]]:
+    """Worker: analisa um representante de cada hash único"""
+    from test_prompt_injection import PromptValidator
+
+    results = []
+    for digest, path in items:
+        try:
+            text = _read_text(path)
+        except OSError as e:
+            results.append((digest, {"kind": KIND_SKIPPED, "error": str(e)}))
+            continue
+        kind, item_id, payload = classify_document(path, text)
+        if kind == KIND_SKIPPED:
+            results.append((digest, {"kind": kind}))
+            continue
+        review = PromptValidator.review(payload, versions)
+        results.append((digest, {"kind": kind, "pr_id": item_id, **review}))
+    return results
+
+
+def _init_scan_worker(cache_path: Optional[str], cache_enabled: bool) -> None:
+    from test_prompt_injection import _init_worker
+    _init_worker(cache_path, cache_enabled)
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_scan(roots: Sequence[str], include: Sequence[str] = DEFAULT_INCLUDE,
+              versions: Sequence[str] = ("V2", "V3"), workers: int = 0,
+              cache_path: Optional[str] = None, cache_enabled: bool = True) -> Iterator[Dict]:
+    """Gera um registro por arquivo; conteúdos repetidos são analisados uma vez"""
+    paths = list(iter_files(roots, include))
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker,
+                             initargs=(cache_path, cache_enabled)) as pool:
+        hashed: List[Tuple[str, int, Optional[str]]] = []
+        for block in pool.map(_hash_files, _chunks(paths, HASH_CHUNK)):
+            hashed.extend(block)
+
+        representatives: Dict[str, str] = {}
+        for path, _, digest in hashed:
+            if digest is not None and digest not in representatives:
+                representatives[digest] = path
+
+        verdicts: Dict[str, Dict] = {}
+        jobs = [pool.submit(_scan_files, block, list(versions))
+                for block in _chunks(list(representatives.items()), SCAN_CHUNK)]
+        for job in jobs:
+            verdicts.update(job.result())
+
+    for path, size, digest in hashed:
+        if digest is None:
+            yield {"path": path, "kind": KIND_SKIPPED, "error": "ilegível"}
+            continue
+        record = {"path": path, "size": size, "sha256": digest, **verdicts[digest]}
+        if representatives[digest] != path:
+            record["duplicate_of"] = representatives[digest]
+        yield record
+
+
+def write_records(records: Iterable[Dict], out: IO[str]) -> Dict[str, int]:
+    """Grava os registros em JSONL e devolve os totais"""
+    totals = {"files": 0, "unique": 0, "duplicates": 0, "terraform": 0, "pr": 0,
+              "skipped": 0, "blocked": 0, "bytes": 0}
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        totals["files"] += 1
+        totals["bytes"] += record.get("size", 0)
+        totals[record["kind"]] += 1
+        totals["duplicates" if "duplicate_of" in record else "unique"] += 1
+        totals["blocked"] += 1 if record.get("blocked") else 0
+    return totals
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Varredura em massa de arquivos Terraform e PRs")
+    parser.add_argument("roots", nargs="+", help="Diretórios ou arquivos")
+    parser.add_argument("--include", nargs="*", default=DEFAULT_INCLUDE, help="Padrões de nome de arquivo")
+    parser.add_argument("--versions", nargs="*", help="Versões de prompt (padrão: V2 V3)")
+    parser.add_argument("--workers", type=int, default=0, help="Processos (0 = todos os núcleos)")
+    parser.add_argument("--output", help="Arquivo JSONL (padrão: stdout)")
+    parser.add_argument("--cache-db", metavar="PATH", help="Cache SQLite compartilhado entre execuções")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--fail-on-block", action="store_true", help="Sai com código 1 se algo for bloqueado")
+    args = parser.parse_args()
+    try:
+        versions = parse_versions(args.versions)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        totals = write_records(bulk_scan(args.roots, args.include, versions, args.workers,
+                                         args.cache_db, not args.no_cache), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"{totals['files']} arquivos ({totals['unique']} únicos, {totals['duplicates']} duplicados): "
+          f"{totals['terraform']} terraform, {totals['pr']} PRs, {totals['skipped']} ignorados; "
+          f"{totals['blocked']} bloqueados em {elapsed:.2f}s "
+          f"({totals['files'] / elapsed if elapsed > 0 else 0:.0f} arquivos/s)", file=sys.stderr)
+    return 1 if args.fail_on_block and totals["blocked"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
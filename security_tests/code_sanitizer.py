@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Sanitização de Código para Prompts
+Produz o texto que entra nos placeholders {CODIGO_VALIDADO} (V2) e
+{CODIGO_ULTRA_SANITIZADO} (V3). Aproveita os spans do PromptValidator
+(tokens HCL, keywords, blobs decodificados) para remover comentários
+suspeitos, neutralizar delimitadores falsos e caracteres invisíveis e
+truncar no orçamento de tokens. O payload é reescrito em uma única
+passada (lista de spans + um join) e cada troca fica no mapa de redações
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, NamedTuple, Optional, Tuple
+
+from hcl_lexer import CODE, COMMENT
+
+# Estimativa de tokens do modelo (média para código em inglês/HCL)
+CHARS_PER_TOKEN = 4
+
+# Imitações dos delimitadores dos prompts V2/V3 (procuradas no texto normalizado)
+DELIMITER_LOOKALIKE = re.compile(
+    r"<{2,}\s*\[[^\]\n]{0,64}\]\s*>{2,}|\[\s*CODIGO_(?:INICIO|FIM)\s*\]",
+    re.IGNORECASE,
+)
+# Controles C0 (exceto tab/quebras), DEL, largura zero e overrides bidirecionais
+INVISIBLE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\u00ad\u200b-\u200f\u202a-\u202e\u2060-\u2069\ufeff]+")
+
+KIND_COMMENT = "comment"
+KIND_KEYWORD = "keyword"
+KIND_DELIMITER = "delimiter"
+KIND_INVISIBLE = "invisible"
+KIND_BLOB = "encoded_blob"
+KIND_TRUNCATED = "truncated"
+
+REDACTED_KEYWORD = "[REDACTED]"
+REDACTED_DELIMITER = "[DELIMITADOR REMOVIDO]"
+REDACTED_BLOB = "[BLOB CODIFICADO REMOVIDO]"
+REDACTED_COMMENT = "[comentário removido]"
+
+
+class Redaction(NamedTuple):
+    """Trecho [start, end) do original trocado por `replacement` na saída"""
+    start: int
+    end: int
+    kind: str
+    replacement: str
+    output_start: int
+
+
+@dataclass(frozen=True)
+class SanitizedCode:
+    """Código pronto para o prompt e o mapa de redações aplicadas"""
+    text: str
+    original_size: int
+    redactions: List[Redaction] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.redactions) and self.redactions[-1].kind == KIND_TRUNCATED
+
+    @property
+    def estimated_tokens(self) -> int:
+        return -(-len(self.text) // CHARS_PER_TOKEN)
+
+
+def _inside_identifier(code: str, start: int, end: int) -> bool:
+    """Keyword colada a outras letras (ex.: "bypass_security", referenciado como var.bypass_security)"""
+    before = code[start - 1] if start > 0 else ""
+    after = code[end] if end < len(code) else ""
+    return (before.isalnum() or before == "_") or (
+        code[end - 1].isalnum() and (after.isalnum() or after == "_"))
+
+
+def _comment_replacement(comment: str) -> str:
+    """Mantém o estilo do comentário para não quebrar o HCL"""
+    if comment.startswith("/*"):
+        return f"/* {REDACTED_COMMENT} */"
+    return f"{'//' if comment.startswith('//') else '#'} {REDACTED_COMMENT}"
+
+
+def _truncation_marker(omitted: int) -> str:
+    return f"\n# [TRUNCADO: {omitted} caracteres omitidos]"
+
+
+class CodeSanitizer:
+    """Sanitizador memoizado por conteúdo (V2 e V3 recebem o mesmo código)
+
+    O LRU é limitado pelos bytes retidos (código + saída), como o do lexer,
+    e a chave inclui o orçamento e a configuração dos detectores
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, memo_bytes: int = 16 << 20):
+        self.max_tokens = max_tokens
+        self.memo_bytes = memo_bytes
+        self.size = 0
+        self._memo: "OrderedDict[Tuple[str, Optional[int], str], SanitizedCode]" = OrderedDict()
+
+    def edits(self, code: str) -> List[Tuple[int, int, str, str]]:
+        """Trocas (início, fim, tipo, substituto) em offsets do original, ordenadas"""
+        from test_prompt_injection import PromptValidator
+
+        index = PromptValidator.token_index(code)
+        edits = []
+
+        # Comentários com keywords maliciosas saem inteiros; fora deles a
+        # keyword é trocada só em strings/heredocs/texto (ignore_changes é HCL válido)
+        flagged = set()
+        for match in PromptValidator.scan_keywords(code):
+            if match.group != "malicious":
+                continue
+            token = index.token_at(match.start)
+            if token is None or token.kind == CODE:
+                continue
+            if token.kind == COMMENT:
+                if token not in flagged:
+                    flagged.add(token)
+                    replacement = _comment_replacement(code[token.start:token.end])
+                    edits.append((token.start, token.end, KIND_COMMENT, replacement))
+            elif not _inside_identifier(code, match.start, match.end):
+                edits.append((match.start, match.end, KIND_KEYWORD, REDACTED_KEYWORD))
+
+        normalized = PromptValidator.normalize(code)
+        for m in DELIMITER_LOOKALIKE.finditer(normalized.text):
+            start, end = normalized.span_to_original(m.span())
+            edits.append((start, end, KIND_DELIMITER, REDACTED_DELIMITER))
+
+        for m in INVISIBLE.finditer(code):
+            edits.append((m.start(), m.end(), KIND_INVISIBLE, ""))
+
+        # Blobs cujo conteúdo decodificado tem keywords (só se o contexto já acusou)
+        if PromptValidator.analyze(code)["encoded_keywords"]:
+            masked = index.masked(PromptValidator.SCAN_KINDS)
+            for layer in PromptValidator.decode_payload(masked):
+                if layer.depth == 1 and PromptValidator.detect_encoded_injection(layer.blob)[0]:
+                    edits.append((layer.span[0], layer.span[1], KIND_BLOB, REDACTED_BLOB))
+
+        # Spans maiores primeiro quando começam no mesmo ponto
+        edits.sort(key=lambda e: (e[0], -e[1]))
+        return edits
+
+    def sanitize(self, code: str) -> SanitizedCode:
+        """Aplica as trocas em uma passada e trunca no orçamento de tokens"""
+        from test_prompt_injection import PromptValidator
+
+        key = (PromptValidator.config_version(), self.max_tokens, code)
+        memo = self._memo.get(key)
+        if memo is not None:
+            self._memo.move_to_end(key)
+            return memo
+
+        edits = self.edits(code)
+        budget = self.max_tokens * CHARS_PER_TOKEN if self.max_tokens else None
+        result = self._apply(code, edits, budget)
+        if result is None:
+            # Não coube: refaz reservando espaço para o marcador de truncamento,
+            # que também conta no orçamento
+            reserve = len(_truncation_marker(len(code)))
+            result = self._apply(code, edits, max(0, budget - reserve), budget)
+
+        size = len(code) + len(result.text)
+        if size <= self.memo_bytes:
+            self._memo[key] = result
+            self.size += size
+            while self.size > self.memo_bytes:
+                (_, _, evicted), old = self._memo.popitem(last=False)
+                self.size -= len(evicted) + len(old.text)
+        return result
+
+    def clear(self) -> None:
+        self._memo.clear()
+        self.size = 0
+
+    @staticmethod
+    def _apply(code: str, edits: List[Tuple[int, int, str, str]], budget: Optional[int],
+               limit: Optional[int] = None) -> Optional[SanitizedCode]:
+        """Uma passada no orçamento; sem `limit`, None se o código não coube"""
+        parts: List[str] = []
+        redactions: List[Redaction] = []
+        size = 0
+        position = 0
+
+        def keep(end: int) -> bool:
+            """Copia code[position:end]; False se o orçamento acabou"""
+            nonlocal size, position
+            chunk = code[position:end]
+            if budget is not None and size + len(chunk) > budget:
+                room = budget - size
+                cut = chunk.rfind("\n", 0, room)
+                cut = cut if cut > 0 else room
+                parts.append(chunk[:cut])
+                size += cut
+                position += cut
+                return False
+            parts.append(chunk)
+            size += len(chunk)
+            position = end
+            return True
+
+        complete = True
+        for start, end, kind, replacement in edits:
+            if start < position:
+                continue  # contido em uma troca anterior (ex.: keyword no comentário)
+            if not keep(start) or (budget is not None and size + len(replacement) > budget):
+                complete = False
+                break
+            redactions.append(Redaction(start, end, kind, replacement, size))
+            parts.append(replacement)
+            size += len(replacement)
+            position = end
+        if complete:
+            complete = keep(len(code))
+
+        if not complete:
+            if limit is None:
+                return None
+            # Orçamento menor que o próprio marcador: o marcador é cortado
+            marker = _truncation_marker(len(code) - position)[:limit - size]
+            redactions.append(Redaction(position, len(code), KIND_TRUNCATED, marker, size))
+            parts.append(marker)
+
+        return SanitizedCode("".join(parts), len(code), redactions)
+
+
+SANITIZER = CodeSanitizer()
+
+
+def sanitize_code(code: str, max_tokens: Optional[int] = None) -> SanitizedCode:
+    """Atalho: sanitizador padrão ou um com orçamento de tokens próprio"""
+    if max_tokens is None:
+        return SANITIZER.sanitize(code)
+    return CodeSanitizer(max_tokens).sanitize(code)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Análise Incremental de Diffs
+Reanalisa apenas as linhas adicionadas/alteradas de um unified diff (com a
+janela de contexto do próprio hunk) e combina as novas detecções com os
+veredictos já calculados para a versão base de cada arquivo
+"""
+
+import argparse
+import io
+import json
+import re
+import sys
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from stream_scanner import StreamScanner
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+@dataclass
+class Hunk:
+    """Hunk de um unified diff"""
+    old_start: int
+    old_len: int
+    new_start: int
+    new_len: int
+    new_lines: List[str] = field(default_factory=list)   # contexto + adicionadas
+    added: Set[int] = field(default_factory=set)         # nº de linha (novo)
+    removed: Set[int] = field(default_factory=set)       # nº de linha (base)
+    context: Dict[int, int] = field(default_factory=dict)  # base -> novo
+
+
+@dataclass
+class FileDiff:
+    """Alterações de um arquivo"""
+    path: str
+    is_new: bool = False
+    is_deleted: bool = False
+    hunks: List[Hunk] = field(default_factory=list)
+
+
+def parse_unified_diff(text: str) -> List[FileDiff]:
+    """Converte um unified diff (git diff / diff -u) em FileDiffs"""
+    files: List[FileDiff] = []
+    current: Optional[FileDiff] = None
+    hunk: Optional[Hunk] = None
+    old_line = new_line = 0
+    old_left = new_left = 0
+    old_path = ""
+
+    for line in text.splitlines():
+        # Dentro de um hunk, as contagens do cabeçalho dizem o que é conteúdo
+        if hunk is not None and (old_left > 0 or new_left > 0):
+            if line.startswith("+"):
+                hunk.new_lines.append(line[1:])
+                hunk.added.add(new_line)
+                new_line += 1
+                new_left -= 1
+            elif line.startswith("-"):
+                hunk.removed.add(old_line)
+                old_line += 1
+                old_left -= 1
+            elif line.startswith(" ") or line == "":
+                hunk.new_lines.append(line[1:])
+                hunk.context[old_line] = new_line
+                old_line += 1
+                new_line += 1
+                old_left -= 1
+                new_left -= 1
+            continue
+
+        if line.startswith("--- "):
+            old_path = line[4:].split("\t")[0].strip()
+            current = FileDiff(path="", is_new=old_path == "/dev/null")
+            hunk = None
+        elif line.startswith("+++ ") and current is not None:
+            path = line[4:].split("\t")[0].strip()
+            if path == "/dev/null":
+                current.is_deleted = True
+                path = old_path[2:] if old_path.startswith("a/") else old_path
+            current.path = path[2:] if path.startswith("b/") else path
+            files.append(current)
+        elif current is not None:
+            header = _HUNK_HEADER.match(line)
+            if header:
+                old_start, old_len, new_start, new_len = header.groups()
+                hunk = Hunk(int(old_start), int(1 if old_len is None else old_len),
+                            int(new_start), int(1 if new_len is None else new_len))
+                current.hunks.append(hunk)
+                old_line, new_line = hunk.old_start, hunk.new_start
+                old_left, new_left = hunk.old_len, hunk.new_len
+
+    return files
+
+
+def _remap_line(line: int, hunks: List[Hunk]) -> Optional[int]:
+    """Mapeia uma linha da base para o arquivo novo (None se removida)"""
+    delta = 0
+    for hunk in hunks:
+        # Em hunks vazios de um lado, o início aponta para a linha anterior
+        old_end = hunk.old_start + hunk.old_len + (1 if hunk.old_len == 0 else 0)
+        new_end = hunk.new_start + hunk.new_len + (1 if hunk.new_len == 0 else 0)
+        if line < hunk.old_start:
+            break
+        if line < old_end:
+            if line in hunk.removed:
+                return None
+            if line in hunk.context:
+                return hunk.context[line]
+            break
+        delta = new_end - old_end
+    return line + delta
+
+
+def scan_findings(text: str, first_line: int = 1,
+                  scanner: Optional[StreamScanner] = None) -> List[Dict]:
+    """Executa os detectores e converte offsets em (linha inicial, linha final)"""
+    scanner = scanner or StreamScanner()
+    starts = [0]
+    for i, ch in enumerate(text):
+        if ch == "\n":
+            starts.append(i + 1)
+
+    findings = []
+    for detection in scanner.scan(io.StringIO(text)):
+        findings.append({
+            "line": first_line + bisect_right(starts, detection.start) - 1,
+            "end_line": first_line + bisect_right(starts, max(detection.start, detection.end - 1)) - 1,
+            "kind": detection.kind,
+            "name": detection.name,
+            "value": detection.value,
+        })
+    return findings
+
+
+def _file_verdict(findings: List[Dict], **extra) -> Dict:
+    findings.sort(key=lambda f: (f["line"], f["kind"], f["name"], f["value"]))
+    return {"detected": bool(findings), "findings": findings, **extra}
+
+
+def scan_diff(diff_text: str, verdicts: Dict[str, Dict],
+              scanner: Optional[StreamScanner] = None) -> Dict[str, Dict]:
+    """Reanalisa só os hunks alterados e combina com os veredictos em cache"""
+    scanner = scanner or StreamScanner()
+    result = dict(verdicts)
+
+    for file_diff in parse_unified_diff(diff_text):
+        if file_diff.is_deleted:
+            result.pop(file_diff.path, None)
+            continue
+
+        cached = verdicts.get(file_diff.path)
+        findings: List[Dict] = []
+
+        # Detecções da base que sobreviveram, com as linhas remapeadas
+        if cached is not None and not file_diff.is_new:
+            for finding in cached.get("findings", []):
+                line = _remap_line(finding["line"], file_diff.hunks)
+                end_line = _remap_line(finding.get("end_line", finding["line"]), file_diff.hunks)
+                if line is None or end_line is None:
+                    continue
+                findings.append({**finding, "line": line, "end_line": end_line})
+
+        # Novas detecções: o hunk inteiro é a janela, mas só contam as que
+        # tocam alguma linha adicionada (as demais já estão no cache)
+        for hunk in file_diff.hunks:
+            if not hunk.added:
+                continue
+            window = "\n".join(hunk.new_lines)
+            for finding in scan_findings(window, hunk.new_start, scanner):
+                lines = range(finding["line"], finding["end_line"] + 1)
+                if any(n in hunk.added for n in lines):
+                    findings.append(finding)
+
+        unique = {json.dumps(f, sort_keys=True): f for f in findings}
+        partial = cached is None and not file_diff.is_new
+        result[file_diff.path] = _file_verdict(list(unique.values()), changed=True, partial=partial)
+
+    return result
+
+
+def scan_full(path: str, scanner: Optional[StreamScanner] = None) -> Dict:
+    """Veredicto completo de um arquivo (usado para popular o cache)"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return _file_verdict(scan_findings(f.read(), 1, scanner), changed=False, partial=False)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Análise incremental de unified diffs")
+    parser.add_argument("--diff", required=True, help="Arquivo com o unified diff ('-' = stdin)")
+    parser.add_argument("--verdicts", help="JSON com os veredictos da base (por arquivo)")
+    parser.add_argument("--output", help="Onde salvar os veredictos atualizados (padrão: stdout)")
+    parser.add_argument("--base-files", nargs="*", default=[],
+                        help="Arquivos da base a analisar por completo antes do diff")
+    args = parser.parse_args()
+
+    verdicts: Dict[str, Dict] = {}
+    if args.verdicts:
+        with open(args.verdicts, "r", encoding="utf-8") as f:
+            verdicts = json.load(f)
+    for path in args.base_files:
+        verdicts.setdefault(path, scan_full(path))
+
+    if args.diff == "-":
+        diff_text = sys.stdin.read()
+    else:
+        with open(args.diff, "r", encoding="utf-8") as f:
+            diff_text = f.read()
+    result = scan_diff(diff_text, verdicts)
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 1 if any(v["detected"] for v in result.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
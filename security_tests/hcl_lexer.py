@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Lexer de HCL (Terraform)
+Divide o payload uma única vez em comentários, strings, heredocs, texto
+livre e código, com offsets. Os detectores analisam só o que o modelo lê
+como linguagem natural, e não identificadores ou valores da estrutura HCL.
+Só é código a linha reconhecida como sintaxe HCL (cabeçalho de bloco,
+atributo, expressão); todo o resto é texto livre
+"""
+
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from pattern_registry import Span
+
+COMMENT = "comment"
+STRING = "string"
+HEREDOC = "heredoc"
+TEXT = "text"       # linhas fora de comentários/strings não reconhecidas como HCL
+CODE = "code"
+KINDS = [COMMENT, STRING, HEREDOC, TEXT, CODE]
+
+# Tipos em que um ataque pode ser escrito em linguagem natural
+SCANNABLE: FrozenSet[str] = frozenset({COMMENT, STRING, HEREDOC, TEXT})
+
+_STRING_BODY = r'(?:[^"\\\n$]|\\.|\$(?!\{)|\$\{(?:[^}"\n]|"(?:[^"\\\n]|\\.)*")*\}?)*'
+_TOKENS = re.compile(rf"""
+    (?P<comment>\#[^\n]*|//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<heredoc><<-?(?P<tag>[A-Za-z_][\w-]*)[ \t]*\n.*?(?:^[ \t]*(?P=tag)[ \t]*$|\Z))
+  | (?P<string>"{_STRING_BODY}(?:"|$))
+""", re.X | re.S | re.M)
+
+# Tokens de uma linha de código HCL, no esqueleto em que strings e
+# heredocs viraram "" e comentários viraram espaços
+_LINE_TOKENS = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<string>"[^"\n]*"?)
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_][\w-]*)
+  | (?P<attr>\.(?:[A-Za-z_][\w-]*|\d+|\*))
+  | (?P<op>=>|==|!=|<=|>=|&&|\|\||\.\.\.|[=<>!?:+\-*/%,])
+  | (?P<open>[{\[(])
+  | (?P<close>[}\])])
+""", re.X)
+_OPERANDS = frozenset({"string", "number", "ident", "attr", "close"})
+_OPERAND_STARTS = frozenset({"string", "number", "ident"})
+# Palavras que podem vir lado a lado: for/in/if de expressões for
+_FOR_KEYWORDS = frozenset({"for", "in", "if"})
+_FOR = re.compile(r"\bfor\b")
+_NOT_NEWLINE = re.compile(r"[^\n]")
+
+
+@dataclass(frozen=True)
+class HCLToken:
+    """Trecho contíguo do payload de um único tipo (offsets de caractere)"""
+    kind: str
+    start: int
+    end: int
+
+
+def is_hcl_line(line: str) -> bool:
+    """Linha do esqueleto reconhecida como sintaxe HCL
+
+    Aceita cabeçalhos de bloco (tipo e labels entre aspas antes de "{"),
+    atributos e expressões. Palavras vizinhas sem operador, ponto
+    final, apóstrofos e ":" fora de condicionais/for/objetos JSON são prosa
+    """
+    previous = None
+    previous_text = ""
+    header = True       # só identificadores e labels desde o início da linha
+    adjacent = False    # palavras lado a lado: só válido se vier um "{"
+    spaced = False
+    colon_ok = "?" in line or _FOR.search(line) is not None
+    position = 0
+    while position < len(line):
+        m = _LINE_TOKENS.match(line, position)
+        if m is None:
+            return False
+        kind, value = m.lastgroup, m.group()
+        position = m.end()
+        if kind == "space":
+            spaced = True
+            continue
+        if kind == "attr" and (spaced or previous not in _OPERANDS):
+            return False
+        if value == ":":
+            if not colon_ok and previous != "string":
+                return False
+        if (spaced and kind in _OPERAND_STARTS and previous in _OPERANDS
+                and value not in _FOR_KEYWORDS and previous_text not in _FOR_KEYWORDS):
+            # Em cabeçalhos só o tipo do bloco é identificador; os labels são strings
+            if not header or kind != "string":
+                return False
+            adjacent = True
+        if value == "{" and header:
+            adjacent = False
+        if kind not in ("ident", "string"):
+            if adjacent:
+                return False
+            header = False
+        previous, previous_text, spaced = kind, value, False
+    return not adjacent
+
+
+def _skeleton(text: str, matches: List["re.Match"]) -> str:
+    """Texto com o mesmo tamanho em que strings/heredocs viram "" e comentários somem"""
+    parts = []
+    position = 0
+    for match in matches:
+        parts.append(text[position:match.start()])
+        chunk = match.group()
+        if match.lastgroup == COMMENT:
+            parts.append(_NOT_NEWLINE.sub(" ", chunk))
+        else:
+            first, newline, rest = chunk.partition("\n")
+            parts.append('""' + " " * (len(first) - 2) if len(first) >= 2 else '"')
+            parts.append(newline + _NOT_NEWLINE.sub(" ", rest))
+        position = match.end()
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def _line_runs(skeleton: str) -> Tuple[List[int], List[str]]:
+    """Offsets em que o tipo das linhas muda (código/texto) e o tipo de cada trecho"""
+    starts: List[int] = []
+    kinds: List[str] = []
+    seen: Dict[str, str] = {}
+    position = 0
+    for line in skeleton.split("\n"):
+        kind = seen.get(line)
+        if kind is None:
+            kind = seen[line] = CODE if is_hcl_line(line) else TEXT
+        if not kinds or kinds[-1] != kind:
+            starts.append(position)
+            kinds.append(kind)
+        position += len(line) + 1
+    return starts, kinds
+
+
+def _split_code(start: int, end: int, runs: Tuple[List[int], List[str]], out: List[HCLToken]) -> None:
+    """Separa um trecho fora de strings/comentários em código e texto livre
+
+    A linha inteira decide, incluindo as strings e comentários vizinhos
+    """
+    starts, kinds = runs
+    i = bisect_right(starts, start) - 1
+    position = start
+    while position < end:
+        piece_end = min(end, starts[i + 1]) if i + 1 < len(starts) else end
+        kind = kinds[i]
+        if out and out[-1].kind == kind and out[-1].end == position:
+            out[-1] = HCLToken(kind, out[-1].start, piece_end)
+        else:
+            out.append(HCLToken(kind, position, piece_end))
+        position = piece_end
+        i += 1
+
+
+def tokenize(text: str) -> List[HCLToken]:
+    """Tokeniza o payload; os tokens cobrem o texto inteiro, em ordem"""
+    matches = list(_TOKENS.finditer(text))
+    runs = _line_runs(_skeleton(text, matches))
+    tokens: List[HCLToken] = []
+    position = 0
+    for match in matches:
+        if match.start() > position:
+            _split_code(position, match.start(), runs, tokens)
+        tokens.append(HCLToken(match.lastgroup, match.start(), match.end()))
+        position = match.end()
+    if position < len(text):
+        _split_code(position, len(text), runs, tokens)
+    return tokens
+
+
+class TokenIndex:
+    """Tokens de um payload com consultas por tipo e por offset"""
+
+    def __init__(self, text: str, tokens: Optional[List[HCLToken]] = None):
+        self.text = text
+        self.tokens = tokens if tokens is not None else tokenize(text)
+        self._starts = [token.start for token in self.tokens]
+        self._masked = {}
+
+    def spans(self, kinds: Iterable[str] = SCANNABLE) -> List[Span]:
+        """Spans dos tokens dos tipos pedidos"""
+        kinds = frozenset(kinds)
+        return [(t.start, t.end) for t in self.tokens if t.kind in kinds]
+
+    def token_at(self, offset: int) -> Optional[HCLToken]:
+        """Token que contém o offset"""
+        i = bisect_right(self._starts, offset) - 1
+        if i < 0 or offset >= self.tokens[i].end:
+            return None
+        return self.tokens[i]
+
+    def kind_at(self, offset: int) -> Optional[str]:
+        """Tipo do token que contém o offset"""
+        token = self.token_at(offset)
+        return token.kind if token is not None else None
+
+    def masked(self, kinds: Iterable[str] = SCANNABLE) -> str:
+        """Texto com os demais tipos trocados por espaços (offsets preservados)"""
+        kinds = frozenset(kinds)
+        if kinds not in self._masked:
+            parts = []
+            for token in self.tokens:
+                chunk = self.text[token.start:token.end]
+                if token.kind not in kinds:
+                    # Preserva quebras de linha para não unir palavras de linhas diferentes
+                    chunk = re.sub(r"[^\n]", " ", chunk)
+                parts.append(chunk)
+            self._masked[kinds] = "".join(parts)
+        return self._masked[kinds]
+
+
+class HCLLexer:
+    """Lexer com LRU de índices: V2 e V3 reutilizam o mesmo TokenIndex
+
+    O LRU é limitado pelo tamanho dos payloads retidos (memo_bytes), não
+    pelo número de entradas; payloads maiores que o limite não ficam no LRU
+    """
+
+    def __init__(self, memo_bytes: int = 16 << 20):
+        self.memo_bytes = memo_bytes
+        self.size = 0
+        self._memo: "OrderedDict[str, TokenIndex]" = OrderedDict()
+
+    def index(self, text: str) -> TokenIndex:
+        """Retorna o índice do payload, tokenizando apenas na primeira vez"""
+        index = self._memo.get(text)
+        if index is not None:
+            self._memo.move_to_end(text)
+            return index
+        index = TokenIndex(text)
+        if len(text) <= self.memo_bytes:
+            self._memo[text] = index
+            self.size += len(text)
+            while self.size > self.memo_bytes:
+                evicted, _ = self._memo.popitem(last=False)
+                self.size -= len(evicted)
+        return index
+
+    def clear(self) -> None:
+        self._memo.clear()
+        self.size = 0
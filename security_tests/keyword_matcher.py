@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Motor de Busca Multi-Padrão (Aho-Corasick)
+Encontra todas as keywords de várias listas em uma única passada linear,
+sem criar cópias do payload em maiúsculas/minúsculas. Letras ASCII
+minúsculas têm transições próprias no autômato; o restante do Unicode é
+normalizado caractere a caractere
+"""
+
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """Ocorrência de uma keyword no texto original"""
+    start: int
+    end: int
+    group: str
+    index: int
+    keyword: str
+
+
+class KeywordMatcher:
+    """Autômato Aho-Corasick case-insensitive compilado uma única vez"""
+
+    def __init__(self, groups: Dict[str, Sequence[str]]):
+        # Cada estado: transições, link de falha e saídas (group, index, tamanho)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, int, int]]] = [[]]
+        self._keywords: Dict[str, Tuple[str, ...]] = {}
+        self._fold: Dict[str, str] = {}
+
+        for group, keywords in groups.items():
+            self._keywords[group] = tuple(keywords)
+            for index, keyword in enumerate(keywords):
+                self._add(group, index, keyword)
+
+        self._build_failure_links()
+        self._add_lowercase_transitions()
+
+    def _add(self, group: str, index: int, keyword: str) -> None:
+        """Insere uma keyword (normalizada com upper) na trie"""
+        folded = keyword.upper()
+        if not folded:
+            raise ValueError(f"Keyword vazia no grupo '{group}'")
+
+        state = 0
+        for ch in folded:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((group, index, len(folded)))
+
+    def _build_failure_links(self) -> None:
+        """Calcula os links de falha em largura (BFS)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def _add_lowercase_transitions(self) -> None:
+        """Duplica as transições de letras ASCII em minúsculas (após os links de falha)"""
+        for goto in self._goto:
+            for ch, nxt in list(goto.items()):
+                if ch.isascii() and ch.isalpha():
+                    goto[ch.lower()] = nxt
+
+    def keywords(self, group: str) -> Tuple[str, ...]:
+        """Retorna as keywords originais de um grupo"""
+        return self._keywords[group]
+
+    def iter_matches(self, text: str) -> Iterable[KeywordMatch]:
+        """Percorre o texto uma vez e gera todas as ocorrências (com sobreposição)"""
+        if text.isascii():
+            return self._iter_ascii(text)
+        return self._iter_unicode(text)
+
+    def _iter_ascii(self, text: str) -> Iterable[KeywordMatch]:
+        """Caminho rápido: em ASCII não há expansões e os offsets não mudam"""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        keywords = self._keywords
+        state = 0
+
+        for i, c in enumerate(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if out[state]:
+                for group, index, length in out[state]:
+                    yield KeywordMatch(i - length + 1, i + 1, group, index, keywords[group][index])
+
+    def _iter_unicode(self, text: str) -> Iterable[KeywordMatch]:
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        fold = self._fold
+        keywords = self._keywords
+
+        # Caracteres cujo upper() gera mais de um caractere (ex.: 'ß' -> 'SS')
+        # deslocam a posição normalizada; guardamos os pontos de expansão
+        # para mapear as ocorrências de volta aos offsets originais.
+        expansions: List[int] = []
+        shifts: List[int] = []
+        shift = 0
+        state = 0
+        fpos = -1
+
+        for i, ch in enumerate(text):
+            up = fold.get(ch)
+            if up is None:
+                up = fold[ch] = ch.upper()
+            if len(up) > 1:
+                shift += len(up) - 1
+                expansions.append(fpos + len(up))
+                shifts.append(shift)
+            for c in up:
+                fpos += 1
+                while state and c not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(c, 0)
+                if out[state]:
+                    for group, index, length in out[state]:
+                        fstart = fpos - length + 1
+                        if expansions:
+                            k = bisect_right(expansions, fstart)
+                            start = fstart - (shifts[k - 1] if k else 0)
+                        else:
+                            start = fstart
+                        yield KeywordMatch(start, i + 1, group, index, keywords[group][index])
+
+    def scan(self, text: str) -> List[KeywordMatch]:
+        """Retorna todas as ocorrências ordenadas pela posição final"""
+        return list(self.iter_matches(text))
+
+    def found(self, text: str) -> Dict[str, set]:
+        """Retorna, por grupo, os índices das keywords encontradas"""
+        result: Dict[str, set] = {group: set() for group in self._keywords}
+        if not text.isascii():
+            for match in self._iter_unicode(text):
+                result[match.group].add(match.index)
+            return result
+
+        # Só importa a presença: guarda os estados com saída e resolve no fim
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        hits = set()
+        state = 0
+        for c in text:
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if out[state]:
+                hits.add(state)
+        for state in hits:
+            for group, index, _ in out[state]:
+                result[group].add(index)
+        return result
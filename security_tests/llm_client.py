@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Validação via LLM (assíncrona)
+Renderiza os prompts de prompts/ com o código analisado e envia para um
+endpoint compatível com a API da OpenAI usando um pool de conexões
+keep-alive, concorrência limitada, rate limiting e retries. Com
+sanitize=True, V2/V3 recebem o código sanitizado (code_sanitizer) e um
+item com keywords, comentários ou blobs removidos é bloqueado sem chamar
+o modelo. Usa apenas a biblioteca padrão; pode ser testado offline com
+llm_stub_server.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import ssl
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from code_sanitizer import KIND_BLOB, KIND_COMMENT, KIND_KEYWORD, SANITIZER, CodeSanitizer
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "..", "prompts")
+
+PROMPT_FILES = {
+    "V1": ("v1_basico.md", "{CODIGO}"),
+    "V2": ("v2_melhorado.md", "{CODIGO_VALIDADO}"),
+    "V3": ("v3_robusto.md", "{CODIGO_ULTRA_SANITIZADO}"),
+}
+
+# Versões cujo placeholder recebe o código sanitizado (V1 é a linha de base, sem proteções)
+SANITIZED_VERSIONS = ("V2", "V3")
+
+INCIDENT_MARKER = "[SECURITY INCIDENT DETECTED]"
+_CLASSIFICATION = re.compile(r"Classifica[çc][ãa]o(?: Geral)?:\s*\[?\s*([A-ZÁÉÍÓÚÂÊÔÃÕÇ]+)", re.IGNORECASE)
+_BLOCKING_CLASSES = {"CRÍTICO", "CRITICO", "REJEITADO", "BLOQUEADO"}
+
+_templates: Dict[str, str] = {}
+
+
+# ========================================
+# PROMPTS E VEREDICTOS
+# ========================================
+
+def load_prompt_template(version: str) -> str:
+    """Extrai (uma única vez) o bloco do prompt de prompts/<versão>.md"""
+    if version not in _templates:
+        filename, placeholder = PROMPT_FILES[version]
+        with open(os.path.join(PROMPTS_DIR, filename), "r", encoding="utf-8") as f:
+            text = f.read()
+        section = text[text.index(f"## Prompt {version}"):]
+        start = section.index("```") + 3
+        end = section.index("```", start)
+        template = section[start:end].strip("\n")
+        if placeholder not in template:
+            raise ValueError(f"Placeholder {placeholder} ausente no prompt {version}")
+        _templates[version] = template
+    return _templates[version]
+
+
+def render_prompt(version: str, code: str, sanitizer=None) -> str:
+    """Substitui o placeholder do template pelo código (sem str.format: há chaves no texto)
+
+    Com um code_sanitizer.CodeSanitizer, V2/V3 recebem o código sanitizado
+    """
+    if sanitizer is not None and version in SANITIZED_VERSIONS:
+        code = sanitizer.sanitize(code).text
+    return load_prompt_template(version).replace(PROMPT_FILES[version][1], code, 1)
+
+
+@dataclass(frozen=True)
+class LLMVerdict:
+    """Veredicto estruturado extraído da resposta do modelo"""
+    blocked: bool
+    classification: str
+    raw: str
+
+
+def parse_verdict(text: str) -> LLMVerdict:
+    """Interpreta a resposta: incidente, JSON estruturado ou 'Classificação: X'"""
+    if INCIDENT_MARKER in text:
+        return LLMVerdict(True, "INCIDENT", text)
+
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            data = json.loads(match.group())
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and ("blocked" in data or "classification" in data):
+            classification = str(data.get("classification", "")).upper()
+            blocked = bool(data.get("blocked", classification in _BLOCKING_CLASSES))
+            return LLMVerdict(blocked, classification, text)
+
+    match = _CLASSIFICATION.search(text)
+    classification = match.group(1).upper() if match else "DESCONHECIDO"
+    return LLMVerdict(classification in _BLOCKING_CLASSES, classification, text)
+
+
+# ========================================
+# HTTP: POOL KEEP-ALIVE
+# ========================================
+
+class HTTPError(Exception):
+    """Resposta HTTP com status de erro"""
+
+    def __init__(self, status: int, body: bytes):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+
+
+class LLMRequestError(Exception):
+    """Falha definitiva de uma requisição ao modelo (após os retries)"""
+
+    def __init__(self, message: str, attempts: int):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AsyncHTTPPool:
+    """Pool de conexões HTTP/1.1 keep-alive para um único host"""
+
+    def __init__(self, base_url: str, max_connections: int = 16, timeout: float = 60.0,
+                 headers: Optional[Dict[str, str]] = None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.tls = parts.scheme == "https"
+        self.port = parts.port or (443 if self.tls else 80)
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+    async def _acquire(self) -> _Connection:
+        await self._slots.acquire()
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.reader.at_eof():
+                return conn
+            conn.close()
+        try:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port, ssl=ssl.create_default_context() if self.tls else None
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    def _release(self, conn: _Connection, reusable: bool) -> None:
+        if reusable:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    async def post_json(self, path: str, payload: Dict) -> Dict:
+        """POST com corpo JSON; retorna o JSON da resposta"""
+        body = json.dumps(payload).encode("utf-8")
+        lines = [
+            f"POST {self.prefix}{path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive",
+        ]
+        lines.extend(f"{k}: {v}" for k, v in self.headers.items())
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        conn = await self._acquire()
+        reusable = False
+        try:
+            conn.writer.write(request)
+            await conn.writer.drain()
+            status, headers, data = await asyncio.wait_for(self._read_response(conn.reader), self.timeout)
+            reusable = headers.get("connection", "").lower() != "close"
+        finally:
+            self._release(conn, reusable)
+
+        if status >= 400:
+            raise HTTPError(status, data)
+        return json.loads(data.decode("utf-8"))
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Conexão encerrada pelo servidor")
+        parts = status_line.split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise ValueError(f"Linha de status inválida: {status_line[:80]!r}")
+        status = int(parts[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            return status, headers, b"".join(chunks)
+        return status, headers, await reader.readexactly(int(headers.get("content-length", "0")))
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+class RateLimiter:
+    """Token bucket: no máximo `rate` requisições por segundo"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# ========================================
+# EXECUTOR ASSÍNCRONO
+# ========================================
+
+# Veredicto de um item cuja requisição falhou: bloqueia por precaução
+ERROR_CLASSIFICATION = "ERRO"
+
+# Redações que só acontecem quando há injeção no código: o item é bloqueado
+# em vez de chegar ao modelo já limpo
+INJECTION_REDACTIONS = frozenset({KIND_KEYWORD, KIND_COMMENT, KIND_BLOB})
+REDACTED_CLASSIFICATION = "SANITIZADO"
+
+
+@dataclass(frozen=True)
+class LLMResult:
+    """Resultado de uma validação via modelo (`error` preenchido se a requisição falhou)"""
+    case_id: str
+    prompt_version: str
+    verdict: LLMVerdict
+    latency: float
+    attempts: int
+    error: Optional[str] = None
+    redactions: Tuple[str, ...] = ()
+
+
+class AsyncLLMValidator:
+    """Envia prompts renderizados ao modelo com concorrência, retries e rate limiting
+
+    Cada prompt é uma requisição chat/completions (o endpoint legado
+    /v1/completions não aceita modelos de chat); `prefetch` define quantos
+    itens por slot de concorrência são lidos à frente da entrada
+    """
+
+    RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+    def __init__(self, endpoint: str, model: str = "gpt-3.5-turbo", api_key: Optional[str] = None,
+                 concurrency: int = 8, rate_limit: float = 0.0, max_retries: int = 3,
+                 backoff: float = 0.5, prefetch: int = 1, timeout: float = 60.0,
+                 temperature: float = 0.0, sanitizer: Optional[CodeSanitizer] = None,
+                 sanitize: bool = False):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.pool = AsyncHTTPPool(endpoint, max_connections=concurrency, timeout=timeout, headers=headers)
+        self.model = model
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate_limit, burst=concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.prefetch = max(1, prefetch)
+        self.temperature = temperature
+        # Com sanitize=True, V2/V3 recebem o código sanitizado
+        self.sanitizer = (sanitizer or SANITIZER) if sanitize else None
+        self.prompt_chars = 0
+        self.requests = 0
+        self.retries = 0
+
+    async def _call(self, path: str, payload: Dict) -> Tuple[Dict, int]:
+        """Requisição com retry exponencial para erros transitórios"""
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.limiter.acquire()
+            self.requests += 1
+            try:
+                return await self.pool.post_json(path, payload), attempt
+            except HTTPError as exc:
+                if exc.status not in self.RETRY_STATUS or attempt > self.max_retries:
+                    raise LLMRequestError(str(exc), attempt) from exc
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError) as exc:
+                # Rede, DNS (gaierror) e TLS (SSLError) são transitórios
+                if attempt > self.max_retries:
+                    raise LLMRequestError(f"{type(exc).__name__}: {exc}", attempt) from exc
+            except ValueError as exc:
+                # Resposta que não é HTTP/JSON válido: repetir não adianta
+                raise LLMRequestError(f"Resposta inválida: {type(exc).__name__}: {exc}", attempt) from exc
+            self.retries += 1
+            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+    async def _complete(self, prompt: str) -> Tuple[str, int]:
+        """Envia um prompt via chat/completions; retorna (texto, tentativas)"""
+        response, attempts = await self._call("/v1/chat/completions", {
+            "model": self.model,
+            "temperature": self.temperature,
+            "messages": [{"role": "user", "content": prompt}],
+        })
+        try:
+            return response["choices"][0]["message"]["content"], attempts
+        except (KeyError, IndexError, TypeError) as exc:
+            raise LLMRequestError(f"Resposta inesperada: {str(response)[:200]}", attempts) from exc
+
+    async def _validate(self, case_id: str, version: str, code: str) -> LLMResult:
+        """Valida um item; uma falha definitiva vira um resultado com `error`"""
+        start = time.perf_counter()
+        if self.sanitizer is not None and version in SANITIZED_VERSIONS:
+            sanitized = self.sanitizer.sanitize(code)
+            removed = tuple(sorted({r.kind for r in sanitized.redactions} & INJECTION_REDACTIONS))
+            if removed:
+                verdict = LLMVerdict(True, REDACTED_CLASSIFICATION, "")
+                return LLMResult(case_id, version, verdict, time.perf_counter() - start, 0,
+                                 redactions=removed)
+            code = sanitized.text
+        prompt = render_prompt(version, code)
+        self.prompt_chars += len(prompt)
+        try:
+            text, attempts = await self._complete(prompt)
+        except LLMRequestError as exc:
+            verdict = LLMVerdict(True, ERROR_CLASSIFICATION, "")
+            return LLMResult(case_id, version, verdict, time.perf_counter() - start,
+                             exc.attempts, str(exc))
+        return LLMResult(case_id, version, parse_verdict(text), time.perf_counter() - start, attempts)
+
+    async def validate_many(self, items: Iterable[Tuple[str, str, str]]) -> List[LLMResult]:
+        """Valida pares (case_id, versão, código); resultados na ordem de entrada
+
+        Os itens são lidos sob demanda (no máximo concurrency * prefetch em
+        voo) e um erro em um item não descarta os resultados dos demais
+        """
+        window = self.concurrency * self.prefetch
+        results: Dict[int, LLMResult] = {}
+        running: Set[asyncio.Future] = set()
+
+        async def run(index: int, item: Tuple[str, str, str]) -> None:
+            results[index] = await self._validate(*item)
+
+        try:
+            for index, item in enumerate(items):
+                running.add(asyncio.ensure_future(run(index, item)))
+                if len(running) >= window:
+                    done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+            if running:
+                done, running = await asyncio.wait(running)
+                for task in done:
+                    task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            await self.pool.close()
+        return [results[index] for index in range(len(results))]
+
+
+def run_llm_validation(items: Iterable[Tuple[str, str, str]], endpoint: str, **options) -> List[LLMResult]:
+    """Atalho síncrono para AsyncLLMValidator.validate_many"""
+    return asyncio.run(AsyncLLMValidator(endpoint, **options).validate_many(items))
+
+
+def main() -> int:
+    from test_prompt_injection import TEST_CASES, load_test_cases
+
+    parser = argparse.ArgumentParser(description="Validação dos casos de teste via LLM")
+    parser.add_argument("--endpoint", help="URL base da API (padrão: stub local)")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--versions", nargs="*", default=["V1", "V2", "V3"], choices=list(PROMPT_FILES))
+    parser.add_argument("--corpus", help="Corpus JSONL no lugar de TEST_CASES")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requisições por segundo (0 = sem limite)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--prefetch", type=int, default=1,
+                        help="Itens lidos à frente por slot de concorrência")
+    parser.add_argument("--sanitize", action="store_true",
+                        help="Sanitiza o código dos prompts V2/V3 (bloqueia se remover uma injeção)")
+    parser.add_argument("--max-prompt-tokens", type=int, metavar="N",
+                        help="Trunca o código sanitizado em ~N tokens")
+    args = parser.parse_args()
+
+    cases = load_test_cases(args.corpus) if args.corpus else TEST_CASES
+    items = [(case.id, version, case.payload) for case in cases for version in args.versions]
+    options = dict(model=args.model, api_key=os.environ.get("OPENAI_API_KEY"),
+                   concurrency=args.concurrency, rate_limit=args.rate_limit,
+                   max_retries=args.retries, prefetch=args.prefetch,
+                   sanitize=args.sanitize)
+    if args.max_prompt_tokens:
+        # O orçamento vem do sanitizador: --max-prompt-tokens implica --sanitize
+        options.update(sanitizer=CodeSanitizer(args.max_prompt_tokens), sanitize=True)
+
+    start = time.perf_counter()
+    if args.endpoint:
+        validator = AsyncLLMValidator(args.endpoint, **options)
+        results = asyncio.run(validator.validate_many(items))
+    else:
+        from llm_stub_server import StubServer
+        with StubServer() as server:
+            validator = AsyncLLMValidator(server.url, **options)
+            results = asyncio.run(validator.validate_many(items))
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        status = "BLOQUEADO" if result.verdict.blocked else "PERMITIDO"
+        print(f"{result.case_id:20s} {result.prompt_version}  {status:10s} "
+              f"{result.verdict.classification:12s} {result.latency * 1000:7.1f}ms"
+              + (f"  {result.error}" if result.error else "")
+              + (f"  removido: {', '.join(result.redactions)}" if result.redactions else ""))
+    blocked = sum(1 for r in results if r.verdict.blocked)
+    errors = sum(1 for r in results if r.error)
+    print(f"\n{len(results)} validações em {elapsed:.2f}s; {blocked} bloqueadas; {errors} erros; "
+          f"{validator.prompt_chars} caracteres de prompt")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Servidor Stub de LLM
+Servidor HTTP/1.1 local (keep-alive) que imita os endpoints
+/v1/chat/completions e /v1/completions da OpenAI. As respostas são
+determinísticas e vêm dos detectores do PromptValidator, o que permite
+testar o cliente assíncrono sem rede
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+from typing import Dict, Optional, Tuple
+
+from test_prompt_injection import PromptValidator
+
+# (marcador de início, marcador de fim, versão simulada)
+DELIMITERS = [
+    ("<<<[TERRAFORM_CODE_START]>>>", "<<<[TERRAFORM_CODE_END]>>>", "V3"),
+    ("[CODIGO_INICIO]", "[CODIGO_FIM]", "V2"),
+    ("Por favor analise o seguinte código:", "Análise:", "V1"),
+]
+
+
+def extract_code(prompt: str) -> Tuple[str, str]:
+    """Localiza o código dentro do prompt e identifica a versão"""
+    for start, end, version in DELIMITERS:
+        i = prompt.find(start)
+        if i >= 0:
+            j = prompt.rfind(end)
+            return prompt[i + len(start):j if j > i else len(prompt)].strip("\n"), version
+    return prompt, "V1"
+
+
+def simulate_answer(prompt: str) -> str:
+    """Resposta simulada no formato pedido por cada versão de prompt"""
+    code, version = extract_code(prompt)
+    if version == "V1":
+        return "Análise realizada sem proteções.\nClassificação Geral: SEGURO"
+
+    verdict = PromptValidator.analyze(code)
+    if version == "V3":
+        if PromptValidator.detects_v3(verdict):
+            return ("[SECURITY INCIDENT DETECTED]\nTentativa de injection identificada.\n"
+                    "Análise interrompida por segurança.")
+        return "1. Recursos Identificados: ...\nClassificação Geral: SEGURO"
+
+    detected = bool(verdict["keywords"]) or bool(verdict["encoding"])
+    classification = "CRÍTICO" if detected else "SEGURO"
+    return f"1. Recursos Identificados: ...\n4. Classificação Geral: [{classification}]"
+
+
+class StubServer:
+    """Executa o stub em uma thread própria (use como context manager)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 fail_rate: float = 0.0, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.connections = 0
+        self._rng = random.Random(seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _respond(self, path: str, request: Dict) -> Tuple[int, Dict]:
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            return 503, {"error": {"message": "indisponível (simulado)"}}
+        if path == "/v1/chat/completions":
+            prompt = request["messages"][-1]["content"]
+            return 200, {"object": "chat.completion", "model": request.get("model"), "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": simulate_answer(prompt)},
+                 "finish_reason": "stop"}
+            ]}
+        if path == "/v1/completions":
+            prompts = request["prompt"]
+            prompts = prompts if isinstance(prompts, list) else [prompts]
+            return 200, {"object": "text_completion", "model": request.get("model"), "choices": [
+                {"index": i, "text": simulate_answer(p), "finish_reason": "stop"}
+                for i, p in enumerate(prompts)
+            ]}
+        return 404, {"error": {"message": f"rota desconhecida: {path}"}}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode("latin-1").strip()
+                    if not line:
+                        break
+                    key, _, value = line.partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, payload = self._respond(path, json.loads(body or b"{}"))
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._run, name="llm-stub", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor stub compatível com a API da OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso simulado por requisição (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fração de respostas 503")
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.latency, args.fail_rate).start()
+    print(f"Stub de LLM em {server.url} (Ctrl+C para encerrar)")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Registro de Padrões Pré-compilados
+Detectores baseados em regex compilados uma única vez no import
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+Span = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class PatternDetector:
+    """Detector nomeado com sua regex já compilada"""
+    name: str
+    regex: Pattern
+    description: str = ""
+
+    def search(self, code: str) -> Optional[Span]:
+        """Retorna o primeiro span encontrado (ou None)"""
+        match = self.regex.search(code)
+        return match.span() if match else None
+
+    def spans(self, code: str) -> List[Span]:
+        """Retorna todos os spans encontrados"""
+        return [match.span() for match in self.regex.finditer(code)]
+
+
+class PatternRegistry:
+    """Coleção de detectores; novos padrões não recompilam os existentes"""
+
+    def __init__(self):
+        self._detectors: Dict[str, PatternDetector] = {}
+        self.version = 0
+
+    def register(self, name: str, pattern: str, flags: int = 0,
+                 description: str = "", replace: bool = False) -> PatternDetector:
+        """Compila e registra um novo detector"""
+        if name in self._detectors and not replace:
+            raise ValueError(f"Detector '{name}' já registrado")
+        detector = PatternDetector(name, re.compile(pattern, flags), description)
+        self._detectors[name] = detector
+        self.version += 1
+        return detector
+
+    def unregister(self, name: str) -> None:
+        """Remove um detector registrado"""
+        del self._detectors[name]
+        self.version += 1
+
+    def get(self, name: str) -> PatternDetector:
+        """Retorna um detector pelo nome"""
+        return self._detectors[name]
+
+    def names(self) -> List[str]:
+        """Nomes dos detectores, na ordem de registro"""
+        return list(self._detectors)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._detectors
+
+    def __iter__(self) -> Iterable[PatternDetector]:
+        return iter(list(self._detectors.values()))
+
+    def signature(self) -> Tuple:
+        """Identifica o conjunto atual de padrões (usado por caches)"""
+        return tuple((d.name, d.regex.pattern, d.regex.flags) for d in self._detectors.values())
+
+    def scan(self, code: str, names: Optional[Iterable[str]] = None) -> Dict[str, List[Span]]:
+        """Executa os detectores e retorna os spans encontrados por nome"""
+        selected = self._detectors if names is None else {n: self._detectors[n] for n in names}
+        result = {}
+        for name, detector in selected.items():
+            spans = detector.spans(code)
+            if spans:
+                result[name] = spans
+        return result
+
+
+# ========================================
+# DETECTORES PADRÃO
+# ========================================
+
+PATTERNS = PatternRegistry()
+
+PATTERNS.register(
+    "encoding_marker", r"BASE64|ENCODED", re.IGNORECASE,
+    "Menção explícita a conteúdo codificado",
+)
+PATTERNS.register(
+    "base64_blob", r"[A-Za-z0-9+/]{20,}={0,2}",
+    description="Sequência com aparência de Base64",
+)
+PATTERNS.register(
+    "hex_blob", r"(?:\\x[0-9A-Fa-f]{2}){8,}|(?:0x)?(?:[0-9A-Fa-f]{2}){16,}",
+    description="Sequência longa de bytes em hexadecimal",
+)
+PATTERNS.register(
+    "url_encoded", r"(?:[A-Za-z0-9._~+-]*%[0-9A-Fa-f]{2}){2,}[A-Za-z0-9._~+-]*",
+    description="Sequência de bytes em URL-encoding",
+)
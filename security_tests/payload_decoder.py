@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Decodificação Recursiva de Payloads
+Localiza blobs Base64/hex/URL-encoding em uma única varredura, decodifica
+em camadas (com limite de profundidade e de bytes) e devolve o texto para
+ser reanalisado pelo motor de keywords
+"""
+
+import base64
+import binascii
+import re
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+from pattern_registry import PATTERNS, Span
+
+_HEX_DIGITS = re.compile(r"(?:0x)?((?:[0-9A-Fa-f]{2})+)")
+_HEX_ESCAPES = r"(?:\\x[0-9A-Fa-f]{2}){8,}"
+
+
+@dataclass(frozen=True)
+class DecodedLayer:
+    """Texto obtido ao decodificar um blob"""
+    depth: int
+    encoding: str
+    span: Span          # posição do blob no texto da camada anterior
+    blob: str
+    text: str
+
+
+class PayloadDecoder:
+    """Decodificador com orçamento fixo de trabalho e memoização de blobs"""
+
+    def __init__(self, max_depth: int = 3, max_total_bytes: int = 1 << 20,
+                 max_blobs: int = 1024, memo_size: int = 4096,
+                 min_printable: float = 0.9):
+        self.max_depth = max_depth
+        self.max_total_bytes = max_total_bytes
+        self.max_blobs = max_blobs
+        self.memo_size = memo_size
+        self.min_printable = min_printable
+        self._memo: "OrderedDict[str, Optional[Tuple[str, str]]]" = OrderedDict()
+        # Uma única regex com um grupo nomeado por tipo de blob
+        self._candidates = re.compile("|".join([
+            f"(?P<url>{PATTERNS.get('url_encoded').regex.pattern})",
+            f"(?P<hexesc>{_HEX_ESCAPES})",
+            f"(?P<base64>{PATTERNS.get('base64_blob').regex.pattern})",
+        ]))
+
+    def _as_text(self, raw: bytes) -> Optional[str]:
+        """Aceita apenas bytes que formam texto legível"""
+        try:
+            text = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        if not text:
+            return None
+        printable = sum(1 for ch in text if ch.isprintable() or ch in "\r\n\t")
+        return text if printable / len(text) >= self.min_printable else None
+
+    def _decode_blob(self, kind: str, blob: str) -> Optional[Tuple[str, str]]:
+        """Tenta decodificar um blob, retornando (encoding, texto)"""
+        if kind == "url":
+            text = self._as_text(unquote_to_bytes(blob))
+            return ("url", text) if text else None
+
+        if kind == "hexesc":
+            text = self._as_text(bytes.fromhex(blob.replace("\\x", "")))
+            return ("hex", text) if text else None
+
+        # Sequências só com dígitos hex são tentadas primeiro como hex
+        hex_match = _HEX_DIGITS.fullmatch(blob)
+        if hex_match and len(hex_match.group(1)) >= 32:
+            text = self._as_text(bytes.fromhex(hex_match.group(1)))
+            if text:
+                return "hex", text
+
+        stripped = blob.rstrip("=")
+        if len(stripped) % 4 == 1:
+            return None
+        try:
+            raw = base64.b64decode(stripped + "=" * (-len(stripped) % 4), validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        text = self._as_text(raw)
+        return ("base64", text) if text else None
+
+    def clear(self) -> None:
+        """Esvazia a memoização de blobs"""
+        self._memo.clear()
+
+    def _lookup(self, kind: str, blob: str) -> Optional[Tuple[str, str]]:
+        """Decodificação memoizada (LRU limitado)"""
+        key = kind + ":" + blob
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+        result = self._decode_blob(kind, blob)
+        self._memo[key] = result
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return result
+
+    def decode(self, code: str) -> List[DecodedLayer]:
+        """Decodifica recursivamente todos os blobs do payload"""
+        layers: List[DecodedLayer] = []
+        seen = set()
+        budget = self.max_total_bytes
+        blobs = 0
+        pending = deque([(code, 1)])
+
+        while pending:
+            text, depth = pending.popleft()
+            if depth > self.max_depth:
+                continue
+            for match in self._candidates.finditer(text):
+                kind = match.lastgroup
+                blob = match.group()
+                if blob in seen:
+                    continue
+                seen.add(blob)
+                blobs += 1
+                if blobs > self.max_blobs:
+                    return layers
+
+                decoded = self._lookup(kind, blob)
+                if decoded is None:
+                    continue
+                encoding, plain = decoded
+                budget -= len(plain)
+                if budget < 0:
+                    return layers
+
+                layers.append(DecodedLayer(depth, encoding, match.span(), blob, plain))
+                pending.append((plain, depth + 1))
+
+        return layers
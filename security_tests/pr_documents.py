@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Documentos de PR
+Extração do código de um documento no formato de pr_samples e validação
+das versões de prompt pedidas. Compartilhado pelo daemon, pela varredura
+em massa, pelo packer e pelas regras Terraform
+"""
+
+from typing import Dict, List, Tuple
+
+# Campos aceitos para o código, na ordem de preferência
+PAYLOAD_FIELDS = ["code_snippet", "payload", "code"]
+
+
+def document_payload(document: Dict) -> Tuple[str, str]:
+    """Extrai (id, código) de um documento no formato de pr_samples"""
+    for field in PAYLOAD_FIELDS:
+        if isinstance(document.get(field), str):
+            item_id = str(document.get("pr_id") or document.get("id") or "")
+            return item_id, document[field]
+    raise ValueError(f"Documento sem código: esperado um dos campos {', '.join(PAYLOAD_FIELDS)}")
+
+
+def parse_versions(versions) -> List[str]:
+    """Valida as versões pedidas: lista de nomes conhecidos (padrão: V2 e V3)"""
+    from test_prompt_injection import PROMPT_VERSIONS
+
+    if versions is None or versions == []:
+        return list(PROMPT_VERSIONS[1:])
+    if not isinstance(versions, list) or not all(isinstance(v, str) for v in versions):
+        raise ValueError("'versions' deve ser uma lista de strings")
+    unknown = [v for v in versions if v not in PROMPT_VERSIONS]
+    if unknown:
+        raise ValueError(f"Versões desconhecidas: {', '.join(unknown)}")
+    return versions
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Instrumentação dos Detectores
+Contagem de chamadas, latência acumulada e percentis, bytes analisados e
+hits de cache por etapa. Os wrappers só são instalados quando o profiler
+é ativado, então o caminho normal não paga nada. Exporta em JSON ou no
+formato de texto do Prometheus
+"""
+
+import functools
+import json
+import random
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+MAX_SAMPLES = 10000
+
+# hook(nome, segundos, bytes, hit) — hit é None para etapas sem cache
+Hook = Callable[[str, float, int, Optional[bool]], None]
+
+
+class StageStats:
+    """Métricas acumuladas de uma etapa (amostras limitadas por reservoir)"""
+
+    __slots__ = ("calls", "total", "bytes", "hits", "misses", "samples", "_rng")
+
+    def __init__(self, seed: int = 0):
+        self.calls = 0
+        self.total = 0.0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.samples = array("d")
+        self._rng = random.Random(seed)
+
+    def add(self, elapsed: float, nbytes: int, hit: Optional[bool]) -> None:
+        self.calls += 1
+        self.total += elapsed
+        self.bytes += nbytes
+        if hit is not None:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(elapsed)
+        else:
+            slot = self._rng.randrange(self.calls)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = elapsed
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.calls if self.calls else 0.0,
+            "p50_seconds": self.percentile(0.50),
+            "p90_seconds": self.percentile(0.90),
+            "p99_seconds": self.percentile(0.99),
+            "bytes": self.bytes,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+        }
+
+
+def _payload_size(args: tuple) -> int:
+    """Tamanho do primeiro argumento texto (o payload analisado)"""
+    for arg in args:
+        if isinstance(arg, str):
+            return len(arg)
+    return 0
+
+
+class Profiler:
+    """Registra métricas por etapa e repassa cada evento aos hooks"""
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+        self.hooks: List[Hook] = []
+        self._installed: List[Tuple[type, str, object]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._installed)
+
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        self.hooks.remove(hook)
+
+    def record(self, name: str, elapsed: float, nbytes: int = 0,
+               hit: Optional[bool] = None) -> None:
+        """Registra um evento (também usado diretamente por código externo)"""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageStats()
+        stage.add(elapsed, nbytes, hit)
+        for hook in self.hooks:
+            hook(name, elapsed, nbytes, hit)
+
+    def _wrap(self, name: str, func: Callable, cache_lookup: bool) -> Callable:
+        record = self.record
+        clock = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            result = func(*args, **kwargs)
+            hit = (result is not None) if cache_lookup else None
+            record(name, clock() - start, _payload_size(args), hit)
+            return result
+        return wrapper
+
+    def instrument(self, owner: type, names: Iterable[str], prefix: str = "",
+                   cache_lookup: bool = False) -> None:
+        """Substitui métodos de `owner` por versões instrumentadas"""
+        for name in names:
+            raw = owner.__dict__[name]
+            if isinstance(raw, staticmethod):
+                wrapped = staticmethod(self._wrap(prefix + name, raw.__func__, cache_lookup))
+            else:
+                wrapped = self._wrap(prefix + name, raw, cache_lookup)
+            self._installed.append((owner, name, raw))
+            setattr(owner, name, wrapped)
+
+    def uninstall(self) -> None:
+        """Restaura os métodos originais"""
+        while self._installed:
+            owner, name, raw = self._installed.pop()
+            setattr(owner, name, raw)
+
+    def reset(self) -> None:
+        self.stages.clear()
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {name: stage.as_dict() for name, stage in self.stages.items()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, namespace: str = "prompt_validator") -> str:
+        """Métricas no formato de exposição de texto do Prometheus"""
+        lines = []
+
+        def family(metric: str, kind: str, help_text: str, rows: List[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {namespace}_{metric} {help_text}")
+            lines.append(f"# TYPE {namespace}_{metric} {kind}")
+            for labels, value in rows:
+                lines.append(f"{namespace}_{metric}{{{labels}}} {value!r}")
+
+        items = sorted(self.stages.items())
+        family("stage_calls_total", "counter", "Chamadas por etapa",
+               [(f'stage="{n}"', s.calls) for n, s in items])
+        family("stage_bytes_total", "counter", "Bytes analisados por etapa",
+               [(f'stage="{n}"', s.bytes) for n, s in items])
+        family("stage_seconds", "summary", "Latência por etapa",
+               [(f'stage="{n}",quantile="{q}"', s.percentile(q))
+                for n, s in items for q in (0.5, 0.9, 0.99)])
+        lines.extend(f'{namespace}_stage_seconds_sum{{stage="{n}"}} {s.total!r}' for n, s in items)
+        lines.extend(f'{namespace}_stage_seconds_count{{stage="{n}"}} {s.calls}' for n, s in items)
+        cached = [(n, s) for n, s in items if s.hits or s.misses]
+        family("cache_lookups_total", "counter", "Consultas ao cache por resultado",
+               [(f'stage="{n}",result="{r}"', v) for n, s in cached
+                for r, v in (("hit", s.hits), ("miss", s.misses))])
+        return "\n".join(lines) + "\n"
+
+    def format_breakdown(self, limit: int = 20) -> str:
+        """Tabela das etapas ordenadas por tempo acumulado"""
+        # Percentual sobre a etapa mais longa (em geral a mais externa)
+        grand = max((s.total for s in self.stages.values()), default=0.0) or 1.0
+        lines = [
+            f"{'Etapa':40s} {'chamadas':>9s} {'total ms':>10s} {'%':>6s} "
+            f"{'p50 µs':>9s} {'p99 µs':>9s} {'MB':>8s}",
+            "-" * 97,
+        ]
+        ordered = sorted(self.stages.items(), key=lambda item: item[1].total, reverse=True)
+        for name, s in ordered[:limit]:
+            line = (f"{name:40s} {s.calls:9d} {s.total * 1000:10.2f} {s.total / grand * 100:6.1f} "
+                    f"{s.percentile(0.5) * 1e6:9.1f} {s.percentile(0.99) * 1e6:9.1f} "
+                    f"{s.bytes / 1e6:8.2f}")
+            if s.hits or s.misses:
+                line += f"  cache {s.hits}/{s.hits + s.misses}"
+            lines.append(line)
+        lines.append("(etapas aninhadas: o tempo de uma etapa inclui o das que ela chama)")
+        return "\n".join(lines)
+
+
+# Instância usada pelo executor de testes
+PROFILER = Profiler()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Empacotamento de Prompts por Orçamento de Tokens
+Divide o Terraform de cada PR nas fronteiras dos blocos de nível superior
+(resource, data, module...), estima tokens localmente, agrupa trechos de
+vários PRs em uma única chamada ao modelo até o limite da janela de
+contexto e devolve o veredicto de cada pacote para os recursos originais.
+PRs maiores que a janela são divididos em vez de falhar
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from hcl_lexer import CODE, tokenize
+from llm_client import AsyncLLMValidator, LLMResult, load_prompt_template, PROMPT_FILES
+
+# Janela de gpt-3.5-turbo e espaço reservado para a resposta
+DEFAULT_CONTEXT_TOKENS = 4096
+DEFAULT_RESERVE_TOKENS = 512
+
+# Cabeçalho de cada trecho no pacote (sem nomes vindos do PR, que poderiam
+# conter keywords e contaminar a análise)
+CHUNK_HEADER = "# [trecho {n}]\n"
+
+_WORDS = re.compile(r"\w+")
+_SYMBOLS = re.compile(r"[^\w\s]")
+# Um token cada, na mesma conta de estimate_tokens (palavras em pedaços de 4)
+_TOKEN_UNITS = re.compile(r"\w{1,4}|[^\w\s]")
+_BLOCK_HEADER = re.compile(r'^\s*([A-Za-z_][\w-]*)((?:\s+(?:"[^"\n]*"|[A-Za-z_][\w-]*))*)\s*=?\s*\{')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa local no estilo BPE: ~4 letras por token, cada símbolo um token"""
+    if not text:
+        return 0
+    words = sum((len(word) + 3) // 4 for word in _WORDS.findall(text))
+    return words + len(_SYMBOLS.findall(text))
+
+
+def code_budget(version: str, context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+                reserve_tokens: int = DEFAULT_RESERVE_TOKENS) -> int:
+    """Tokens disponíveis para o código depois do template e da resposta"""
+    template = load_prompt_template(version).replace(PROMPT_FILES[version][1], "")
+    budget = context_tokens - reserve_tokens - estimate_tokens(template)
+    if budget <= 0:
+        raise ValueError(f"Janela de {context_tokens} tokens não comporta o prompt {version}")
+    return budget
+
+
+# ========================================
+# DIVISÃO EM BLOCOS
+# ========================================
+
+@dataclass(frozen=True)
+class Chunk:
+    """Trecho contínuo de um documento com os endereços dos blocos que contém"""
+    doc_id: str
+    index: int
+    addresses: Tuple[str, ...]
+    start: int
+    end: int
+    text: str
+    tokens: int
+
+
+def block_address(header: str) -> str:
+    """Endereço no estilo do Terraform: aws_s3_bucket.data, data.x.y, module.vpc"""
+    match = _BLOCK_HEADER.match(header)
+    if not match:
+        return "(bloco)"
+    kind = match.group(1)
+    labels = [label.strip('"') for label in match.group(2).split()]
+    if kind == "resource" and labels:
+        return ".".join(labels)
+    return ".".join([kind] + labels)
+
+
+def split_blocks(code: str) -> List[Tuple[int, int, str]]:
+    """Segmentos (início, fim, endereço) que cobrem o código inteiro
+
+    Chaves só contam em tokens de código (não em strings, heredocs ou
+    comentários). Comentários e texto solto entre blocos acompanham o bloco
+    seguinte; o que sobra depois do último bloco acompanha o último
+    """
+    segments: List[Tuple[int, int, str]] = []
+    depth = 0
+    segment_start = 0
+    address = ""
+    for token in tokenize(code):
+        if token.kind != CODE:
+            continue
+        for i in range(token.start, token.end):
+            ch = code[i]
+            if ch == "{":
+                if depth == 0:
+                    line_start = code.rfind("\n", 0, i) + 1
+                    address = block_address(code[line_start:i + 1])
+                depth += 1
+            elif ch == "}" and depth > 0:
+                depth -= 1
+                if depth == 0:
+                    line_end = code.find("\n", i)
+                    end = len(code) if line_end < 0 else line_end + 1
+                    segments.append((segment_start, end, address))
+                    segment_start = end
+
+    if segment_start < len(code):
+        tail = code[segment_start:]
+        if segments and (depth == 0 or not tail.strip()):
+            start, _, last = segments[-1]
+            segments[-1] = (start, len(code), last)
+        else:
+            # Bloco não fechado ou documento sem blocos (texto livre)
+            segments.append((segment_start, len(code), address if depth else "(texto)"))
+    return segments
+
+
+def _split_tokens(text: str, budget: int) -> List[Tuple[int, int]]:
+    """Corta um texto sem quebras de linha em fronteiras de token até o orçamento"""
+    parts = []
+    start = 0
+    used = 0
+    for unit in _TOKEN_UNITS.finditer(text):
+        if used == budget:
+            parts.append((start, unit.start()))
+            start, used = unit.start(), 0
+        used += 1
+    parts.append((start, len(text)))
+    return parts
+
+
+def _split_lines(text: str, budget: int) -> List[Tuple[int, int]]:
+    """Divide um segmento grande demais em linhas inteiras até o orçamento
+
+    Uma linha sozinha maior que o orçamento é cortada em fronteiras de token
+    """
+    parts = []
+    start = 0
+    used = 0
+    position = 0
+    for line in text.splitlines(keepends=True):
+        cost = estimate_tokens(line)
+        if used and used + cost > budget:
+            parts.append((start, position))
+            start, used = position, 0
+        if cost > budget:
+            pieces = _split_tokens(line, budget)
+            for piece_start, piece_end in pieces[:-1]:
+                parts.append((position + piece_start, position + piece_end))
+            start = position + pieces[-1][0]
+            cost = estimate_tokens(line[pieces[-1][0]:])
+        used += cost
+        position += len(line)
+    if position > start:
+        parts.append((start, position))
+    return parts
+
+
+def chunk_document(doc_id: str, code: str, budget: int) -> List[Chunk]:
+    """Trechos de um documento, cada um dentro do orçamento"""
+    chunks: List[Chunk] = []
+    for start, end, address in split_blocks(code):
+        text = code[start:end]
+        tokens = estimate_tokens(text)
+        if tokens <= budget:
+            chunks.append(Chunk(doc_id, len(chunks), (address,), start, end, text, tokens))
+            continue
+        for part_start, part_end in _split_lines(text, budget):
+            part = text[part_start:part_end]
+            chunks.append(Chunk(doc_id, len(chunks), (address,), start + part_start,
+                                start + part_end, part, estimate_tokens(part)))
+    return chunks
+
+
+# ========================================
+# EMPACOTAMENTO
+# ========================================
+
+@dataclass
+class Pack:
+    """Trechos enviados juntos em uma chamada ao modelo"""
+    pack_id: str
+    budget: int
+    chunks: List[Chunk] = field(default_factory=list)
+    tokens: int = 0
+
+    @staticmethod
+    def cost(chunk: Chunk) -> int:
+        return chunk.tokens + estimate_tokens(CHUNK_HEADER.format(n=0))
+
+    def fits(self, chunk: Chunk) -> bool:
+        return self.tokens + self.cost(chunk) <= self.budget
+
+    def add(self, chunk: Chunk) -> None:
+        self.chunks.append(chunk)
+        self.tokens += self.cost(chunk)
+
+    @property
+    def text(self) -> str:
+        parts = []
+        for n, chunk in enumerate(self.chunks, 1):
+            parts.append(CHUNK_HEADER.format(n=n))
+            parts.append(chunk.text if chunk.text.endswith("\n") else chunk.text + "\n")
+        return "".join(parts)
+
+
+def pack_chunks(chunks: Iterable[Chunk], budget: int) -> List[Pack]:
+    """First-fit decreasing: menos chamadas para o mesmo conjunto de trechos"""
+    packs: List[Pack] = []
+    for chunk in sorted(chunks, key=lambda c: c.tokens, reverse=True):
+        for pack in packs:
+            if pack.fits(chunk):
+                break
+        else:
+            pack = Pack(f"pack-{len(packs) + 1:04d}", budget)
+            packs.append(pack)
+        pack.add(chunk)
+    # Ordem estável dentro do pacote facilita a leitura do prompt
+    for pack in packs:
+        pack.chunks.sort(key=lambda c: (c.doc_id, c.index))
+    return packs
+
+
+# ========================================
+# VEREDICTOS POR RECURSO
+# ========================================
+
+@dataclass(frozen=True)
+class ResourceVerdict:
+    """Veredicto do pacote aplicado a um bloco do documento original"""
+    doc_id: str
+    address: str
+    start: int
+    end: int
+    blocked: bool
+    classification: str
+    pack_id: str
+
+
+def split_pack(pack: Pack) -> List[Pack]:
+    """Separa um pacote bloqueado: primeiro por documento, depois ao meio"""
+    groups: Dict[str, List[Chunk]] = {}
+    for chunk in pack.chunks:
+        groups.setdefault(chunk.doc_id, []).append(chunk)
+    if len(groups) == 1:
+        middle = len(pack.chunks) // 2
+        parts = [pack.chunks[:middle], pack.chunks[middle:]]
+    else:
+        parts = list(groups.values())
+    children = []
+    for k, chunks in enumerate(parts, 1):
+        child = Pack(f"{pack.pack_id}.{k}", pack.budget)
+        for chunk in chunks:
+            child.add(chunk)
+        children.append(child)
+    return children
+
+
+async def _validate_rounds(validator: AsyncLLMValidator, packs: List[Pack], version: str,
+                           refine: bool) -> Tuple[List[Pack], List[LLMResult]]:
+    """Valida os pacotes; com refine, pacotes bloqueados são divididos e reenviados
+
+    Isola o trecho culpado em O(log n) chamadas extras por pacote bloqueado,
+    sem que um PR malicioso bloqueie os recursos de outro PR do mesmo pacote
+    """
+    done: List[Tuple[Pack, LLMResult]] = []
+    pending: List[Tuple[Pack, Optional[LLMResult]]] = [(pack, None) for pack in packs]
+    while pending:
+        results = await validator.validate_many((pack.pack_id, version, pack.text) for pack, _ in pending)
+        isolated = {id(parent) for (_, parent), result in zip(pending, results)
+                    if parent is not None and result.verdict.blocked}
+        retry: List[Tuple[Pack, Optional[LLMResult]]] = []
+        for (pack, parent), result in zip(pending, results):
+            if parent is not None and id(parent) not in isolated:
+                # Nenhum filho bloqueado sozinho: o ataque depende dos trechos
+                # juntos, então todos herdam o veredicto do pai
+                done.append((pack, replace(parent, case_id=pack.pack_id)))
+            elif refine and result.verdict.blocked and not result.error and len(pack.chunks) > 1:
+                retry.extend((child, result) for child in split_pack(pack))
+            else:
+                done.append((pack, result))
+        pending = retry
+    return [pack for pack, _ in done], [result for _, result in done]
+
+
+def map_verdicts(packs: Sequence[Pack], results: Sequence[LLMResult]) -> Dict[str, List[ResourceVerdict]]:
+    """Aplica o veredicto de cada pacote a todos os blocos dos seus trechos"""
+    by_pack = {result.case_id: result for result in results}
+    verdicts: Dict[str, List[ResourceVerdict]] = {}
+    for pack in packs:
+        verdict = by_pack[pack.pack_id].verdict
+        for chunk in pack.chunks:
+            for address in chunk.addresses:
+                verdicts.setdefault(chunk.doc_id, []).append(ResourceVerdict(
+                    chunk.doc_id, address, chunk.start, chunk.end,
+                    verdict.blocked, verdict.classification, pack.pack_id,
+                ))
+    for items in verdicts.values():
+        items.sort(key=lambda v: v.start)
+    return verdicts
+
+
+def plan(documents: Iterable[Tuple[str, str]], version: str = "V3",
+         context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+         reserve_tokens: int = DEFAULT_RESERVE_TOKENS, sanitizer=None) -> List[Pack]:
+    """Divide e empacota documentos (id, código) para uma versão de prompt"""
+    budget = code_budget(version, context_tokens, reserve_tokens)
+    chunk_budget = budget - estimate_tokens(CHUNK_HEADER.format(n=0))
+    chunks: List[Chunk] = []
+    for doc_id, code in documents:
+        if sanitizer is not None:
+            code = sanitizer.sanitize(code).text
+        chunks.extend(chunk_document(doc_id, code, chunk_budget))
+    return pack_chunks(chunks, budget)
+
+
+def validate_packed(documents: Iterable[Tuple[str, str]], endpoint: str, version: str = "V3",
+                    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+                    reserve_tokens: int = DEFAULT_RESERVE_TOKENS, sanitizer=None,
+                    refine: bool = True, **options) -> Tuple[List[Pack], Dict[str, List[ResourceVerdict]]]:
+    """Empacota, envia um prompt por pacote e mapeia os veredictos aos recursos"""
+    packs = plan(documents, version, context_tokens, reserve_tokens, sanitizer)
+    # A sanitização (se houver) já foi feita antes do orçamento: o validador
+    # não pode reescrever o pacote, senão o prompt passa do limite
+    options["sanitize"] = False
+    validator = AsyncLLMValidator(endpoint, **options)
+    packs, results = asyncio.run(_validate_rounds(validator, packs, version, refine))
+    return packs, map_verdicts(packs, results)
+
+
+def load_documents(paths: Sequence[str]) -> List[Tuple[str, str]]:
+    """Documentos de PR (JSON de pr_samples) ou arquivos .tf como (id, código)"""
+    from validator_client import load_document
+    from pr_documents import document_payload
+
+    documents = []
+    for path in paths:
+        item_id, code = document_payload(load_document(path))
+        documents.append((item_id or path, code))
+    return documents
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Validação de PRs grandes em pacotes por orçamento de tokens")
+    parser.add_argument("files", nargs="+", help="Documentos JSON de PR ou arquivos .tf")
+    parser.add_argument("--version", default="V3", choices=list(PROMPT_FILES))
+    parser.add_argument("--endpoint", help="URL base da API (padrão: stub local)")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--context-tokens", type=int, default=DEFAULT_CONTEXT_TOKENS)
+    parser.add_argument("--reserve-tokens", type=int, default=DEFAULT_RESERVE_TOKENS,
+                        help="Tokens reservados para a resposta")
+    parser.add_argument("--sanitize", action="store_true", help="Sanitiza o código antes de dividir")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-refine", action="store_true",
+                        help="Não divide pacotes bloqueados (o veredicto vale para o pacote inteiro)")
+    parser.add_argument("--dry-run", action="store_true", help="Só mostra os pacotes, sem chamar o modelo")
+    parser.add_argument("--json", action="store_true", help="Um veredicto por recurso em JSONL")
+    args = parser.parse_args()
+
+    sanitizer = None
+    if args.sanitize:
+        from code_sanitizer import CodeSanitizer
+        sanitizer = CodeSanitizer()
+    documents = load_documents(args.files)
+
+    if args.dry_run:
+        packs = plan(documents, args.version, args.context_tokens, args.reserve_tokens, sanitizer)
+        for pack in packs:
+            docs = sorted({chunk.doc_id for chunk in pack.chunks})
+            print(f"{pack.pack_id}: {len(pack.chunks)} trechos, ~{pack.tokens}/{pack.budget} tokens "
+                  f"({', '.join(docs)})")
+        return 0
+
+    options = dict(model=args.model, concurrency=args.concurrency, refine=not args.no_refine)
+    start = time.perf_counter()
+    if args.endpoint:
+        packs, verdicts = validate_packed(documents, args.endpoint, args.version, args.context_tokens,
+                                          args.reserve_tokens, sanitizer, **options)
+    else:
+        from llm_stub_server import StubServer
+        with StubServer() as server:
+            packs, verdicts = validate_packed(documents, server.url, args.version, args.context_tokens,
+                                              args.reserve_tokens, sanitizer, **options)
+    elapsed = time.perf_counter() - start
+
+    blocked_docs = 0
+    for doc_id, _ in documents:
+        items = verdicts.get(doc_id, [])
+        blocked = any(v.blocked for v in items)
+        blocked_docs += 1 if blocked else 0
+        if args.json:
+            for v in items:
+                print(json.dumps(v.__dict__, ensure_ascii=False))
+            continue
+        print(f"{doc_id}: {'BLOQUEADO' if blocked else 'APROVADO'}")
+        for v in items:
+            status = "BLOQUEADO" if v.blocked else "ok"
+            print(f"  {v.address:40s} {status:10s} {v.classification:12s} {v.pack_id}")
+    print(f"{len(documents)} documentos em {len(packs)} pacotes ({elapsed:.2f}s); "
+          f"{blocked_docs} bloqueados", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Relatórios em Streaming
+Escreve cada execução assim que termina (JSONL, CSV ou o layout de texto
+do TestExecutor) e acumula as estatísticas em uma única passada. Para
+acompanhar a execução enquanto ela roda, use JSONL ou CSV: o texto é
+agrupado por versão e só fica completo no close()
+"""
+
+import csv
+import json
+import shutil
+import tempfile
+from typing import IO, Dict, List, Optional
+
+TEXT = "text"
+JSONL = "jsonl"
+CSV = "csv"
+FORMATS = [TEXT, JSONL, CSV]
+
+CSV_FIELDS = ["prompt_version", "id", "name", "attack_type", "severity",
+              "result", "detected", "explanation"]
+
+
+class StatsAccumulator:
+    """Contadores por versão atualizados a cada execução"""
+
+    def __init__(self, versions: List[str]):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        for version in versions:
+            self._ensure(version)
+
+    def _ensure(self, version: str) -> Dict[str, int]:
+        if version not in self._counts:
+            self._counts[version] = {"total": 0, "passed": 0, "failed": 0, "partial": 0, "detected": 0}
+        return self._counts[version]
+
+    def add(self, version: str, result: str, detected: bool) -> None:
+        counts = self._ensure(version)
+        counts["total"] += 1
+        counts[result.lower()] += 1
+        if detected:
+            counts["detected"] += 1
+
+    def statistics(self) -> Dict[str, Dict]:
+        """Mesmo formato de TestExecutor.calculate_statistics"""
+        stats = {}
+        for version, counts in self._counts.items():
+            total = counts["total"]
+            stats[version] = {
+                **counts,
+                "detection_rate": (counts["detected"] / total * 100) if total > 0 else 0,
+                "success_rate": (counts["passed"] / total * 100) if total > 0 else 0,
+            }
+        return stats
+
+
+class StreamingReporter:
+    """Grava execuções incrementalmente no formato escolhido"""
+
+    def __init__(self, out: IO[str], fmt: str = TEXT, versions: Optional[List[str]] = None,
+                 flush_every: int = 1):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato desconhecido: {fmt}")
+        self.out = out
+        self.fmt = fmt
+        self.flush_every = max(1, flush_every)
+        self.stats = StatsAccumulator(versions or [])
+        self._written = 0
+        self._closed = False
+        self._csv = None
+        # O layout de texto traz o resumo antes dos detalhes: os detalhes de
+        # cada versão vão para arquivos temporários (memória limitada) e são
+        # concatenados no close()
+        self._spools: Dict[str, IO[str]] = {}
+        for version in versions or []:
+            self._spool(version)
+        if fmt == CSV:
+            self._csv = csv.writer(out)
+            self._csv.writerow(CSV_FIELDS)
+
+    def _spool(self, version: str) -> IO[str]:
+        if version not in self._spools:
+            self._spools[version] = tempfile.SpooledTemporaryFile(
+                max_size=1 << 20, mode="w+", encoding="utf-8"
+            )
+        return self._spools[version]
+
+    def write(self, execution) -> None:
+        """Registra uma execução (TestExecution ou ExecutionRecord)"""
+        case = execution.test_case
+        version = execution.prompt_version
+        result = execution.actual_result.value
+        self.stats.add(version, result, execution.detected)
+
+        if self.fmt == TEXT:
+            self._spool(version).write(
+                f"\n{case.id}: {case.name}\n"
+                f"  Tipo de Ataque:    {case.attack_type.value}\n"
+                f"  Severidade:        {case.severity.value}\n"
+                f"  Resultado:         {result}\n"
+                f"  Detectado:         {'SIM' if execution.detected else 'NÃO'}\n"
+                f"  Explicação:        {execution.explanation}\n"
+            )
+            return
+
+        row = {
+            "prompt_version": version,
+            "id": case.id,
+            "name": case.name,
+            "attack_type": case.attack_type.value,
+            "severity": case.severity.value,
+            "result": result,
+            "detected": execution.detected,
+            "explanation": execution.explanation,
+        }
+        if self.fmt == JSONL:
+            self.out.write(json.dumps({"type": "execution", **row}, ensure_ascii=False) + "\n")
+        else:
+            self._csv.writerow([row[field] for field in CSV_FIELDS])
+
+        self._written += 1
+        if self._written % self.flush_every == 0:
+            self.out.flush()
+
+    def statistics(self) -> Dict[str, Dict]:
+        """Estatísticas acumuladas até o momento"""
+        return self.stats.statistics()
+
+    def close(self) -> Dict[str, Dict]:
+        """Finaliza o relatório e retorna as estatísticas"""
+        stats = self.statistics()
+        if self._closed:
+            return stats
+        self._closed = True
+        if self.fmt == TEXT:
+            self.out.write(format_summary(stats))
+            self.out.write("\n" + "=" * 70 + "\n")
+            self.out.write("DETALHES DOS TESTES:\n")
+            self.out.write("=" * 70 + "\n")
+            for version, spool in self._spools.items():
+                self.out.write(f"\n### {version} ###\n")
+                spool.seek(0)
+                shutil.copyfileobj(spool, self.out)
+                spool.close()
+            self._spools.clear()
+        elif self.fmt == JSONL:
+            self.out.write(json.dumps({"type": "summary", "statistics": stats}) + "\n")
+        self.out.flush()
+        return stats
+
+    def __enter__(self) -> "StreamingReporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def format_summary(stats: Dict[str, Dict]) -> str:
+    """Cabeçalho e resumo por versão do relatório de texto"""
+    lines = [
+        "=" * 70 + "\n",
+        "RELATÓRIO DE TESTES - SEGURANÇA DE PROMPT INJECTION\n",
+        "=" * 70 + "\n\n",
+        "RESUMO POR VERSÃO:\n",
+        "-" * 70 + "\n",
+    ]
+    for version, stat in stats.items():
+        lines.append(f"\n{version} (Versão {version}):\n")
+        lines.append(f"  Total de Testes:     {stat['total']}\n")
+        lines.append(f"  Passou:              {stat['passed']}\n")
+        lines.append(f"  Falhou:              {stat['failed']}\n")
+        lines.append(f"  Parcial:             {stat['partial']}\n")
+        lines.append(f"  Taxa de Detecção:    {stat['detection_rate']:.1f}%\n")
+        lines.append(f"  Taxa de Sucesso:     {stat['success_rate']:.1f}%\n")
+    return "".join(lines)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Scanner em Streaming para Payloads Grandes
+Lê arquivos (ou stdin) em blocos de tamanho fixo, mantém uma sobreposição
+entre blocos para não perder keywords nem blobs na fronteira e emite as
+detecções à medida que são encontradas, com memória limitada
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, asdict
+from typing import IO, Iterator, Optional
+
+from pattern_registry import PATTERNS, PatternRegistry
+from test_prompt_injection import PromptValidator
+
+
+@dataclass(frozen=True)
+class StreamDetection:
+    """Detecção com offsets absolutos (em caracteres) na entrada"""
+    kind: str       # keyword | pattern | encoded
+    name: str       # grupo/keyword, nome do detector ou encoding
+    start: int
+    end: int
+    value: str
+
+
+class StreamScanner:
+    """Executa os detectores do PromptValidator sobre uma entrada em blocos"""
+
+    def __init__(self, chunk_size: int = 1 << 20, max_blob_size: int = 64 * 1024,
+                 patterns: Optional[PatternRegistry] = None, decode: bool = True):
+        self.chunk_size = chunk_size
+        self.max_blob_size = max_blob_size
+        self.patterns = patterns or PATTERNS
+        self.decode = decode
+        self.matcher = PromptValidator.keyword_matcher()
+        longest = max(
+            len(k) for group in ("malicious", "confusion") for k in self.matcher.keywords(group)
+        )
+        # Sobreposição mínima: nenhuma keyword (nem início de blob curto)
+        # cruza a fronteira entre blocos sem ser vista
+        self.overlap = max(longest - 1, 256)
+
+    def scan(self, stream: IO[str]) -> Iterator[StreamDetection]:
+        """Lê o stream em blocos e gera as detecções incrementalmente"""
+        tail = ""
+        base = 0                 # offset absoluto do início do buffer
+        keywords_upto = 0        # keywords terminando até aqui já foram reportadas
+        patterns_upto = {d.name: 0 for d in self.patterns}
+
+        while True:
+            chunk = stream.read(self.chunk_size)
+            final = not chunk
+            buffer = tail + chunk
+            if not buffer:
+                return
+
+            # Homóglifos e caracteres de largura zero: offsets mapeados ao original
+            for match in PromptValidator.scan_keywords(buffer):
+                if base + match.end > keywords_upto:
+                    yield StreamDetection(
+                        "keyword", match.group, base + match.start, base + match.end,
+                        buffer[match.start:match.end],
+                    )
+            keywords_upto = base + len(buffer)
+
+            # Blobs que terminam na sobreposição podem continuar no próximo bloco
+            # (ex.: "%4" ou um dígito hex solto antes da fronteira ficam fora do match)
+            boundary = len(buffer) - self.overlap
+            cut = max(0, boundary)
+            for detector in self.patterns:
+                for m in detector.regex.finditer(buffer):
+                    start, end = base + m.start(), base + m.end()
+                    if start < patterns_upto[detector.name]:
+                        continue
+                    if not final and m.end() > boundary and m.end() - m.start() < self.max_blob_size:
+                        cut = min(cut, m.start())
+                        break
+                    patterns_upto[detector.name] = end
+                    yield StreamDetection("pattern", detector.name, start, end, m.group())
+                    if self.decode and detector.name in ("base64_blob", "hex_blob", "url_encoded"):
+                        yield from self._decoded(m.group(), start, end)
+
+            if final:
+                return
+            tail = buffer[cut:]
+            base += cut
+
+    def _decoded(self, blob: str, start: int, end: int) -> Iterator[StreamDetection]:
+        """Reanalisa o conteúdo decodificado de um blob"""
+        for layer in PromptValidator.decode_payload(blob):
+            _, keywords = PromptValidator.detect_malicious_keywords(layer.text)
+            for keyword in keywords:
+                yield StreamDetection("encoded", layer.encoding, start, end, keyword)
+
+    def scan_file(self, path: str) -> Iterator[StreamDetection]:
+        """Analisa um arquivo ('-' para stdin)"""
+        if path == "-":
+            yield from self.scan(sys.stdin)
+            return
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield from self.scan(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scanner em streaming de payloads Terraform")
+    parser.add_argument("paths", nargs="*", default=["-"], help="Arquivos a analisar ('-' = stdin)")
+    parser.add_argument("--chunk-size", type=int, default=1 << 20, help="Tamanho do bloco em caracteres")
+    args = parser.parse_args()
+
+    scanner = StreamScanner(chunk_size=args.chunk_size)
+    found = False
+    for path in args.paths:
+        for detection in scanner.scan_file(path):
+            found = True
+            record = {"file": path, **asdict(detection)}
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
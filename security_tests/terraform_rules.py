@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""
+Regras de Misconfiguração Terraform
+Analisa cada bloco HCL uma única vez (atributos literais e blocos
+aninhados) e executa apenas as regras registradas para o tipo do recurso
+(aws_rds_instance, aws_security_group, aws_s3_bucket_acl...), mais as
+regras gerais. Emite achados CRITICAL/HIGH/MEDIUM com SeverityLevel, o que
+permite rejeitar localmente PRs evidentemente inseguros sem chamar o modelo
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from hcl_lexer import CODE, HEREDOC, STRING, tokenize
+from test_prompt_injection import SeverityLevel
+
+# ========================================
+# PARSER HCL (SUBCONJUNTO)
+# ========================================
+
+_CODE_PIECES = re.compile(r"[A-Za-z_][\w.\-*]*|-?\d+(?:\.\d+)?|\n|[{}\[\]()=,:]|[^\s\w]+")
+_INTERPOLATION = "${"
+
+# Atributo sem valor literal (referência, função, expressão)
+EXPRESSION = None
+
+
+@dataclass
+class Attribute:
+    """Atributo `nome = valor`; value é o literal (str, número, bool, lista, dict) ou None"""
+    name: str
+    value: Any
+    start: int
+    end: int
+    literal: bool
+    source: str         # texto original do valor (para regras sobre expressões)
+
+
+@dataclass
+class Block:
+    """Bloco HCL com seus atributos e blocos aninhados"""
+    kind: str
+    labels: Tuple[str, ...]
+    start: int
+    end: int = 0
+    attributes: Dict[str, Attribute] = field(default_factory=dict)
+    blocks: List["Block"] = field(default_factory=list)
+
+    @property
+    def type(self) -> str:
+        """Chave de despacho: tipo do recurso/data source ou o próprio kind"""
+        if self.kind in ("resource", "data") and self.labels:
+            return self.labels[0]
+        return self.kind
+
+    @property
+    def address(self) -> str:
+        if self.kind == "resource" and self.labels:
+            return ".".join(self.labels)
+        return ".".join((self.kind,) + self.labels)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Valor literal do atributo (default se ausente ou não literal)"""
+        attribute = self.attributes.get(name)
+        if attribute is None or not attribute.literal:
+            return default
+        return attribute.value
+
+    def raw(self, name: str, default: Any = None) -> Any:
+        """Valor mesmo que parcialmente literal (listas guardam o texto das referências)"""
+        attribute = self.attributes.get(name)
+        return default if attribute is None or attribute.value is None else attribute.value
+
+    def children(self, kind: str) -> List["Block"]:
+        return [block for block in self.blocks if block.kind == kind]
+
+
+def _pieces(code: str) -> List[Tuple[str, str, int, int]]:
+    """Tokens finos (tipo, texto, início, fim); comentários e texto livre são descartados"""
+    pieces = []
+    for token in tokenize(code):
+        if token.kind in (STRING, HEREDOC):
+            pieces.append((token.kind, code[token.start:token.end], token.start, token.end))
+        elif token.kind == CODE:
+            for m in _CODE_PIECES.finditer(code, token.start, token.end):
+                text = m.group()
+                if text == "\n":
+                    kind = "nl"
+                elif text[0].isalpha() or text[0] == "_":
+                    kind = "ident"
+                elif text[0].isdigit() or (text[0] == "-" and len(text) > 1 and text[1].isdigit()):
+                    kind = "number"
+                else:
+                    kind = "punct"
+                pieces.append((kind, text, m.start(), m.end()))
+        else:
+            # Comentários e prosa terminam a linha lógica
+            pieces.append(("nl", "", token.end, token.end))
+    return pieces
+
+
+def _string_value(kind: str, text: str) -> Optional[str]:
+    """Conteúdo de uma string/heredoc; None se tiver interpolação"""
+    if kind == HEREDOC:
+        body = text.split("\n", 1)[1] if "\n" in text else ""
+        body = body[:body.rstrip().rfind("\n") + 1] if "\n" in body.rstrip() else ""
+        return None if _INTERPOLATION in body else body
+    inner = text[1:-1]
+    if _INTERPOLATION in inner:
+        return None
+    return inner.replace('\\"', '"').replace("\\\\", "\\")
+
+
+class _Parser:
+    """Descida recursiva sobre os tokens finos"""
+
+    def __init__(self, code: str):
+        self.code = code
+        self.pieces = _pieces(code)
+        self.i = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, str, int, int]:
+        j = self.i + offset
+        return self.pieces[j] if j < len(self.pieces) else ("eof", "", len(self.code), len(self.code))
+
+    def body(self, closing: Optional[str]) -> Tuple[Dict[str, Attribute], List[Block], int]:
+        attributes: Dict[str, Attribute] = {}
+        blocks: List[Block] = []
+        while True:
+            kind, text, start, end = self.peek()
+            if kind == "eof":
+                return attributes, blocks, end
+            if kind == "punct" and text == closing:
+                self.i += 1
+                return attributes, blocks, end
+            if kind in ("ident", STRING) and self.peek(1)[1] in ("=", ":"):
+                self.i += 2
+                name = text if kind == "ident" else text[1:-1]
+                value_start = self.peek()[2]
+                value, literal, value_end = self.expression()
+                source = self.code[value_start:value_end]
+                attributes[name] = Attribute(name, value, start, value_end, literal, source)
+                continue
+            if kind == "ident":
+                block = self.block()
+                if block is not None:
+                    blocks.append(block)
+                    continue
+            self.i += 1
+
+    def block(self) -> Optional[Block]:
+        """Cabeçalho `tipo "rótulo" ... {` seguido do corpo; None se não for bloco"""
+        kind, text, start, _ = self.peek()
+        labels = []
+        j = 1
+        while True:
+            lkind, ltext, _, _ = self.peek(j)
+            if lkind == STRING:
+                labels.append(ltext[1:-1])
+            elif lkind == "ident":
+                labels.append(ltext)
+            elif lkind == "punct" and ltext == "{":
+                break
+            else:
+                return None
+            j += 1
+        self.i += j + 1
+        block = Block(text, tuple(labels), start)
+        block.attributes, block.blocks, block.end = self.body("}")
+        return block
+
+    def expression(self) -> Tuple[Any, bool, int]:
+        """Lê até o fim da linha lógica; devolve (valor, é_literal, fim)"""
+        kind, text, start, end = self.peek()
+        nxt = self.peek(1)
+        simple_end = nxt[0] in ("nl", "eof") or (nxt[0] == "punct" and nxt[1] in ("}", ","))
+        if kind in (STRING, HEREDOC) and simple_end:
+            self.i += 1
+            value = _string_value(kind, text)
+            return value, value is not None, end
+        if kind == "ident" and text in ("true", "false") and simple_end:
+            self.i += 1
+            return text == "true", True, end
+        if kind == "number" and simple_end:
+            self.i += 1
+            return (float(text) if "." in text else int(text)), True, end
+        if kind == "punct" and text == "{":
+            self.i += 1
+            attributes, _, body_end = self.body("}")
+            literal = all(a.literal for a in attributes.values())
+            return {name: a.value for name, a in attributes.items()}, literal, body_end
+        if kind == "punct" and text == "[":
+            return self.list_expression()
+        return self.skip_expression()
+
+    def list_expression(self) -> Tuple[Any, bool, int]:
+        self.i += 1
+        items = []
+        literal = True
+        while True:
+            kind, text, _, end = self.peek()
+            if kind == "eof":
+                return items, False, end
+            self.i += 1
+            if kind == "punct" and text == "]":
+                return items, literal, end
+            if kind in ("nl", "punct") and text in ("", ","):
+                continue
+            if kind in (STRING, HEREDOC):
+                value = _string_value(kind, text)
+                literal = literal and value is not None
+                items.append(value)
+            elif kind == "number":
+                items.append(float(text) if "." in text else int(text))
+            elif kind == "punct" and text in ("[", "{", "("):
+                self.i -= 1
+                self.skip_expression(stop_at_newline=False, until_depth=0)
+                literal = False
+            else:
+                items.append(text)
+                literal = False
+
+    def skip_expression(self, stop_at_newline: bool = True, until_depth: int = -1) -> Tuple[Any, bool, int]:
+        """Consome uma expressão não literal respeitando parênteses/colchetes/chaves"""
+        depth = 0
+        end = self.peek()[2]
+        while True:
+            kind, text, _, piece_end = self.peek()
+            if kind == "eof":
+                return EXPRESSION, False, end
+            if depth == 0 and kind == "nl" and stop_at_newline:
+                return EXPRESSION, False, end
+            if kind == "punct" and text in ("(", "[", "{"):
+                depth += 1
+            elif kind == "punct" and text in (")", "]", "}"):
+                if depth == 0:
+                    return EXPRESSION, False, end
+                depth -= 1
+                if depth == until_depth:
+                    self.i += 1
+                    return EXPRESSION, False, piece_end
+            self.i += 1
+            end = piece_end
+
+
+def parse_blocks(code: str) -> List[Block]:
+    """Blocos de nível superior do código (resource, data, variable, output...)"""
+    _, blocks, _ = _Parser(code).body(None)
+    return blocks
+
+
+# ========================================
+# MOTOR DE REGRAS
+# ========================================
+
+ANY_TYPE = "*"
+
+# Uma regra devolve True, uma mensagem ou uma lista de mensagens para cada achado
+CheckResult = Union[bool, str, Iterable[str], None]
+
+
+class Rule(NamedTuple):
+    """Regra registrada para um ou mais tipos de bloco"""
+    rule_id: str
+    types: Tuple[str, ...]
+    severity: SeverityLevel
+    title: str
+    check: Callable[[Block], CheckResult]
+
+
+class Finding(NamedTuple):
+    """Misconfiguração encontrada em um bloco"""
+    rule_id: str
+    severity: SeverityLevel
+    address: str
+    title: str
+    detail: str
+    start: int
+
+    def as_dict(self) -> Dict:
+        return {"rule_id": self.rule_id, "severity": self.severity.value, "address": self.address,
+                "title": self.title, "detail": self.detail, "start": self.start}
+
+
+SEVERITY_ORDER = [SeverityLevel.CRITICAL, SeverityLevel.HIGH, SeverityLevel.MEDIUM,
+                  SeverityLevel.LOW, SeverityLevel.INFO]
+
+
+class RuleEngine:
+    """Registro de regras indexado pelo tipo do bloco"""
+
+    def __init__(self):
+        self._rules: Dict[str, Rule] = {}
+        self._index: Dict[str, List[Rule]] = {}
+        self.version = 0
+
+    def register(self, rule_id: str, types: Sequence[str], severity: SeverityLevel, title: str,
+                 check: Callable[[Block], CheckResult], replace: bool = False) -> Rule:
+        """Registra uma regra para os tipos dados (ANY_TYPE = todos os blocos)"""
+        if rule_id in self._rules and not replace:
+            raise ValueError(f"Regra '{rule_id}' já registrada")
+        self._rules[rule_id] = Rule(rule_id, tuple(types), severity, title, check)
+        self._reindex()
+        return self._rules[rule_id]
+
+    def unregister(self, rule_id: str) -> None:
+        del self._rules[rule_id]
+        self._reindex()
+
+    def rule(self, rule_id: str, types: Sequence[str], severity: SeverityLevel, title: str):
+        """Decorador de register"""
+        def decorator(check: Callable[[Block], CheckResult]) -> Callable[[Block], CheckResult]:
+            self.register(rule_id, types, severity, title, check)
+            return check
+        return decorator
+
+    def _reindex(self) -> None:
+        self._index = {}
+        for rule in self._rules.values():
+            for block_type in rule.types:
+                self._index.setdefault(block_type, []).append(rule)
+        self.version += 1
+
+    def rules_for(self, block_type: str) -> List[Rule]:
+        """Regras específicas do tipo seguidas das gerais"""
+        return self._index.get(block_type, []) + self._index.get(ANY_TYPE, [])
+
+    def __iter__(self) -> Iterator[Rule]:
+        return iter(list(self._rules.values()))
+
+    def signature(self) -> Tuple:
+        """Identifica o conjunto de regras (usado por caches)"""
+        return tuple((r.rule_id, r.types, r.severity.value, r.check.__qualname__) for r in self._rules.values())
+
+    def evaluate_blocks(self, blocks: Iterable[Block]) -> List[Finding]:
+        findings = []
+        for block in blocks:
+            for rule in self.rules_for(block.type):
+                result = rule.check(block)
+                if not result:
+                    continue
+                details = [""] if result is True else [result] if isinstance(result, str) else list(result)
+                for detail in details:
+                    findings.append(Finding(rule.rule_id, rule.severity, block.address,
+                                            rule.title, detail, block.start))
+        findings.sort(key=lambda f: (SEVERITY_ORDER.index(f.severity), f.start, f.rule_id))
+        return findings
+
+    def evaluate(self, code: str) -> List[Finding]:
+        """Achados do código, do mais grave para o menos grave"""
+        return self.evaluate_blocks(parse_blocks(code))
+
+
+def blocking(findings: Iterable[Finding]) -> List[Finding]:
+    """Achados que justificam rejeitar o PR sem consultar o modelo"""
+    return [f for f in findings if f.severity == SeverityLevel.CRITICAL]
+
+
+RULES = RuleEngine()
+
+# ========================================
+# REGRAS PADRÃO
+# ========================================
+
+# Nomes que guardam o próprio segredo: a palavra sensível termina o nome
+# (master_password, client_secret, auth_token). secret_name, password_secret_arn,
+# token_ttl e password_length só se referem a um segredo e não casam
+SECRET_NAME = re.compile(
+    r"(?:^|_)(?:password|passwd|secret|token|api_key|access_key|secret_key|private_key)$"
+    r"|^secret_(?:string|binary)$",
+    re.IGNORECASE)
+_REFERENCE = re.compile(r"[A-Za-z_][\w.-]*")
+URL_CREDENTIALS = re.compile(r"\b[a-z][a-z0-9+.-]*://[^\s:/@]+:[^\s@/]+@", re.IGNORECASE)
+OPEN_CIDRS = {"0.0.0.0/0", "::/0"}
+SENSITIVE_PORTS = {22, 23, 1433, 1521, 2375, 3306, 3389, 5432, 5900, 6379, 9200, 11211, 27017}
+PUBLIC_ACLS = {"public-read", "public-read-write", "authenticated-read"}
+RDS_TYPES = ("aws_db_instance", "aws_rds_instance", "aws_rds_cluster")
+
+
+def is_secret_name(name: str) -> bool:
+    """Nome de atributo, variável ou output que contém um segredo"""
+    return SECRET_NAME.search(name) is not None
+
+
+def _references_secret(source: str) -> bool:
+    """Expressão que lê um segredo (ex.: aws_db_instance.db.password, var.api_key)"""
+    return any(is_secret_name(ref.rsplit(".", 1)[-1]) for ref in _REFERENCE.findall(source))
+
+
+def _literal_secrets(block: Block) -> Iterator[str]:
+    for name, attribute in block.attributes.items():
+        if is_secret_name(name) and attribute.literal and isinstance(attribute.value, str) and attribute.value:
+            yield f"{name} com valor literal"
+
+
+@RULES.rule("TF-SEC-001", [ANY_TYPE], SeverityLevel.CRITICAL, "Credencial hardcoded")
+def _hardcoded_secret(block: Block) -> CheckResult:
+    if block.kind == "variable":
+        return False  # tratado em TF-VAR-001
+    return list(_literal_secrets(block))
+
+
+@RULES.rule("TF-SEC-002", [ANY_TYPE], SeverityLevel.CRITICAL, "Credencial embutida em URL")
+def _url_credentials(block: Block) -> CheckResult:
+    return [f"{a.name} contém usuário:senha@" for a in block.attributes.values()
+            if URL_CREDENTIALS.search(a.source)]
+
+
+@RULES.rule("TF-VAR-001", ["variable"], SeverityLevel.CRITICAL, "Variável sensível com default literal")
+def _secret_variable_default(block: Block) -> CheckResult:
+    name = block.labels[0] if block.labels else ""
+    return bool(is_secret_name(name) and isinstance(block.get("default"), str) and block.get("default"))
+
+
+@RULES.rule("TF-VAR-002", ["variable"], SeverityLevel.MEDIUM, "Variável sensível sem sensitive = true")
+def _secret_variable_not_sensitive(block: Block) -> CheckResult:
+    name = block.labels[0] if block.labels else ""
+    return is_secret_name(name) and block.get("sensitive") is not True
+
+
+@RULES.rule("TF-OUT-001", ["output"], SeverityLevel.HIGH, "Output com segredo sem sensitive = true")
+def _secret_output(block: Block) -> CheckResult:
+    value = block.attributes.get("value")
+    name = block.labels[0] if block.labels else ""
+    exposes = is_secret_name(name) or (value is not None and _references_secret(value.source))
+    return exposes and block.get("sensitive") is not True
+
+
+@RULES.rule("TF-RDS-001", RDS_TYPES, SeverityLevel.HIGH, "skip_final_snapshot = true")
+def _rds_skip_final_snapshot(block: Block) -> CheckResult:
+    return block.get("skip_final_snapshot") is True
+
+
+@RULES.rule("TF-RDS-002", RDS_TYPES, SeverityLevel.HIGH, "Armazenamento sem encriptação")
+def _rds_unencrypted(block: Block) -> CheckResult:
+    if "storage_encrypted" not in block.attributes:
+        return "storage_encrypted ausente (padrão: false)"
+    return block.get("storage_encrypted") is False
+
+
+@RULES.rule("TF-RDS-003", RDS_TYPES, SeverityLevel.HIGH, "Banco acessível publicamente")
+def _rds_public(block: Block) -> CheckResult:
+    return block.get("publicly_accessible") is True
+
+
+@RULES.rule("TF-RDS-004", RDS_TYPES, SeverityLevel.MEDIUM, "Backups automáticos desativados")
+def _rds_no_backups(block: Block) -> CheckResult:
+    return block.get("backup_retention_period") == 0
+
+
+def _open_rules(block: Block) -> Iterator[Tuple[int, int, str]]:
+    """(porta inicial, final, protocolo) das regras de ingress abertas à internet"""
+    rules = block.children("ingress")
+    if block.type == "aws_security_group_rule" and block.get("type") == "ingress":
+        rules = [block]
+    for rule in rules:
+        cidrs = []
+        for name in ("cidr_blocks", "ipv6_cidr_blocks", "cidr_ipv4", "cidr_ipv6"):
+            value = rule.raw(name, [])
+            cidrs.extend(value if isinstance(value, list) else [value])
+        if not OPEN_CIDRS.intersection(c for c in cidrs if isinstance(c, str)):
+            continue
+        protocol = str(rule.get("protocol", ""))
+        from_port, to_port = rule.get("from_port", 0), rule.get("to_port", 65535)
+        if not isinstance(from_port, int) or not isinstance(to_port, int):
+            from_port, to_port = 0, 65535
+        if protocol in ("-1", "all"):
+            from_port, to_port = 0, 65535
+        yield from_port, to_port, protocol
+
+
+def _exposes_sensitive(from_port: int, to_port: int) -> bool:
+    return to_port - from_port >= 1000 or any(from_port <= p <= to_port for p in SENSITIVE_PORTS)
+
+
+@RULES.rule("TF-SG-001", ["aws_security_group", "aws_security_group_rule"], SeverityLevel.CRITICAL,
+            "Ingress 0.0.0.0/0 em portas sensíveis")
+def _sg_open_sensitive(block: Block) -> CheckResult:
+    return [f"portas {a}-{b}/{p or 'tcp'}" for a, b, p in _open_rules(block) if _exposes_sensitive(a, b)]
+
+
+@RULES.rule("TF-SG-002", ["aws_security_group", "aws_security_group_rule"], SeverityLevel.MEDIUM,
+            "Ingress aberto à internet")
+def _sg_open(block: Block) -> CheckResult:
+    return [f"portas {a}-{b}/{p or 'tcp'}" for a, b, p in _open_rules(block) if not _exposes_sensitive(a, b)]
+
+
+@RULES.rule("TF-S3-001", ["aws_s3_bucket_acl", "aws_s3_bucket"], SeverityLevel.CRITICAL, "Bucket S3 com ACL pública")
+def _s3_public_acl(block: Block) -> CheckResult:
+    acl = block.get("acl")
+    return f"acl = {acl}" if acl in PUBLIC_ACLS else False
+
+
+@RULES.rule("TF-S3-002", ["aws_s3_bucket_public_access_block"], SeverityLevel.HIGH,
+            "Bloqueio de acesso público desativado")
+def _s3_public_access_block(block: Block) -> CheckResult:
+    flags = ("block_public_acls", "block_public_policy", "ignore_public_acls", "restrict_public_buckets")
+    return [f"{flag} = false" for flag in flags if block.get(flag) is False]
+
+
+@RULES.rule("TF-S3-003", ["aws_s3_bucket_server_side_encryption_configuration"], SeverityLevel.HIGH,
+            "Configuração de encriptação S3 sem regra")
+def _s3_empty_encryption(block: Block) -> CheckResult:
+    return not block.children("rule")
+
+
+@RULES.rule("TF-EBS-001", ["aws_ebs_volume"], SeverityLevel.HIGH, "Volume EBS sem encriptação")
+def _ebs_unencrypted(block: Block) -> CheckResult:
+    return block.get("encrypted") is not True
+
+
+@RULES.rule("TF-EC2-001", ["aws_instance"], SeverityLevel.MEDIUM, "Instância com IP público")
+def _ec2_public_ip(block: Block) -> CheckResult:
+    return block.get("associate_public_ip_address") is True
+
+
+
+def main() -> int:
+    from validator_client import load_document
+    from pr_documents import document_payload
+
+    parser = argparse.ArgumentParser(description="Misconfigurações Terraform por regras determinísticas")
+    parser.add_argument("files", nargs="+", help="Documentos JSON de PR ou arquivos .tf")
+    parser.add_argument("--min-severity", default="MEDIUM", choices=[s.value for s in SEVERITY_ORDER])
+    parser.add_argument("--json", action="store_true", help="Um achado por linha em JSONL")
+    args = parser.parse_args()
+
+    threshold = SEVERITY_ORDER.index(SeverityLevel(args.min_severity))
+    status = 0
+    for path in args.files:
+        item_id, code = document_payload(load_document(path))
+        findings = [f for f in RULES.evaluate(code) if SEVERITY_ORDER.index(f.severity) <= threshold]
+        if blocking(findings):
+            status = 1
+        if args.json:
+            for finding in findings:
+                print(json.dumps({"file": path, "id": item_id, **finding.as_dict()}, ensure_ascii=False))
+            continue
+        line_of = lambda offset: code.count("\n", 0, offset) + 1
+        print(f"{path}: {len(findings)} achado(s)")
+        for f in findings:
+            detail = f" ({f.detail})" if f.detail else ""
+            print(f"  {f.severity.value:8s} {f.rule_id:10s} {f.address}:{line_of(f.start)} {f.title}{detail}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
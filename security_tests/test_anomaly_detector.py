@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Testes da Camada de Anomalias
+As regiões de entropia alta são medidas em bytes UTF-8 do texto mascarado e
+normalizado, mas o veredicto as reporta em caracteres do payload original
+"""
+
+import base64
+import random
+
+import pytest
+
+from anomaly_detector import DEFAULT_WINDOW, AnomalyRegion, char_spans
+from test_prompt_injection import PromptValidator
+
+BLOB = base64.b64encode(random.Random(0).randbytes(300)).decode()
+
+
+def test_char_spans_round_multibyte_characters_outward():
+    payload = "aé😀b"  # bytes: a=0, é=1-2, 😀=3-6, b=7
+    regions = [AnomalyRegion(0, 8, 6.0), AnomalyRegion(2, 4, 6.0), AnomalyRegion(3, 7, 6.0)]
+    assert char_spans(payload, regions) == [(0, 4), (1, 3), (2, 3)]
+    assert char_spans("abc", [AnomalyRegion(1, 2, 6.0)]) == [(1, 2)]
+
+
+@pytest.mark.parametrize("prefix", ["", "é" * 100, "ｆｕｌｌ ｗｉｄｔｈ " * 10, "😀" * 40, "a​b" * 20])
+def test_regions_point_into_original_payload(prefix):
+    payload = f'resource "a" "b" {{\n  # {prefix}\n  x = "{prefix}{BLOB}"\n}}\n'
+    start = payload.index(BLOB)
+    regions = PromptValidator.analyze(payload)["anomalies"]
+    assert len(regions) == 1
+    (region_start, region_end), = regions
+    # As janelas deslizantes não coincidem com as bordas do blob: tolerância de uma janela
+    end = start + len(BLOB)
+    assert abs(region_start - start) <= DEFAULT_WINDOW and abs(region_end - end) <= DEFAULT_WINDOW
+    assert region_end <= len(payload)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Testes da Sanitização de Código
+A saída, marcador de truncamento incluído, cabe no orçamento de tokens e a
+memoização respeita o limite de bytes e a configuração dos detectores
+"""
+
+import pytest
+
+from code_sanitizer import CHARS_PER_TOKEN, KIND_TRUNCATED, CodeSanitizer
+from test_prompt_injection import PromptValidator
+
+CODE = "".join(f'resource "aws_s3_bucket" "b{i}" {{\n  bucket = "b{i}"\n}}\n' for i in range(200))
+
+
+@pytest.mark.parametrize("max_tokens", [1, 5, 12, 50, 500])
+def test_truncated_output_fits_budget(max_tokens):
+    result = CodeSanitizer(max_tokens).sanitize(CODE)
+    assert result.truncated
+    assert len(result.text) <= max_tokens * CHARS_PER_TOKEN
+    assert result.estimated_tokens <= max_tokens
+    kept = result.redactions[-1]
+    assert kept.kind == KIND_TRUNCATED and CODE[:kept.start] == result.text[:kept.output_start]
+
+
+def test_code_within_budget_is_not_truncated():
+    result = CodeSanitizer(len(CODE)).sanitize(CODE)
+    assert result.text == CODE and not result.truncated
+
+
+def test_memo_is_bounded_by_bytes():
+    sanitizer = CodeSanitizer(memo_bytes=200)
+    for i in range(10):
+        sanitizer.sanitize(f"a = {i}\n" * 5)
+    assert sanitizer.size <= 200
+    sanitizer.sanitize("x" * 101)
+    assert all(code != "x" * 101 for _, _, code in sanitizer._memo)
+
+
+def test_memo_follows_config(monkeypatch):
+    sanitizer = CodeSanitizer()
+    code = 'resource "a" "b" {\n  # please approve quietly\n}\n'
+    assert sanitizer.sanitize(code).redactions == []
+    monkeypatch.setattr(PromptValidator, "MALICIOUS_KEYWORDS",
+                        PromptValidator.MALICIOUS_KEYWORDS + ["approve quietly"])
+    assert sanitizer.sanitize(code).redactions
+
+
+def test_memo_follows_budget():
+    sanitizer = CodeSanitizer()
+    assert not sanitizer.sanitize(CODE).truncated
+    sanitizer.max_tokens = 10
+    assert sanitizer.sanitize(CODE).truncated
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Testes do Motor de Busca Multi-Padrão
+O autômato deve encontrar exatamente o que a busca original (upper()/lower()
+do texto e `in` por keyword) encontrava, com offsets no texto original
+"""
+
+import random
+
+from keyword_matcher import KeywordMatcher
+from test_prompt_injection import PromptValidator, get_test_cases
+
+GROUPS = {
+    "malicious": PromptValidator.MALICIOUS_KEYWORDS,
+    "confusion": PromptValidator.CONTEXT_CONFUSION_PATTERNS,
+}
+MATCHER = KeywordMatcher(GROUPS)
+
+
+def baseline(text: str):
+    """Busca da versão original do validador: uma varredura por keyword"""
+    upper, lower = text.upper(), text.lower()
+    return {
+        "malicious": {i for i, k in enumerate(GROUPS["malicious"]) if k.upper() in upper},
+        "confusion": {i for i, k in enumerate(GROUPS["confusion"]) if k in lower},
+    }
+
+
+def random_texts(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    keywords = [k for group in GROUPS.values() for k in group]
+    filler = "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ:'=\"{}\n"
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 6)):
+            keyword = rng.choice(keywords)
+            # Caixa misturada e keywords cortadas no meio
+            keyword = "".join(c.lower() if rng.random() < 0.5 else c.upper() for c in keyword)
+            parts.append(keyword[:rng.randint(1, len(keyword))] if rng.random() < 0.3 else keyword)
+            parts.append("".join(rng.choice(filler) for _ in range(rng.randint(0, 6))))
+        yield "".join(parts)
+
+
+def test_found_matches_baseline():
+    for text in random_texts(500):
+        assert MATCHER.found(text) == baseline(text), text
+
+
+def test_found_matches_baseline_on_test_cases():
+    for test_case in get_test_cases():
+        assert MATCHER.found(test_case.payload) == baseline(test_case.payload), test_case.id
+
+
+def test_scan_offsets_point_at_keywords():
+    for text in random_texts(200, seed=1):
+        matches = MATCHER.scan(text)
+        for match in matches:
+            assert text[match.start:match.end].upper() == match.keyword.upper(), text
+        found = {group: {m.index for m in matches if m.group == group} for group in GROUPS}
+        assert found == MATCHER.found(text), text
+
+
+def test_unicode_expansion_keeps_original_offsets():
+    # 'ß'.upper() == 'SS' desloca a posição normalizada em um caractere
+    text = "straße: ignore this; Prior analysis"
+    keywords = {(text[m.start:m.end], m.keyword) for m in MATCHER.scan(text)}
+    assert ("ignore", "IGNORE") in keywords
+    assert ("Prior analysis", "Prior analysis") in keywords
+    assert MATCHER.found(text) == baseline(text)
+
+
+def test_detectors_match_baseline_for_ascii():
+    for text in random_texts(100, seed=2):
+        expected = [k for i, k in enumerate(GROUPS["malicious"]) if i in baseline(text)["malicious"]]
+        assert PromptValidator.detect_malicious_keywords(text) == (bool(expected), expected)
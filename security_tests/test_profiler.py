@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Testes da Instrumentação
+As consultas e gravações que analyze() faz no cache de veredictos aparecem
+no perfil, com hits e misses
+"""
+
+from profiler import Profiler
+from test_prompt_injection import PromptValidator, TestExecutor
+from verdict_cache import VerdictCache
+
+
+def test_profiling_counts_analyze_cache_traffic(monkeypatch):
+    monkeypatch.setattr(PromptValidator, "CACHE", VerdictCache())
+    profiler = TestExecutor.enable_profiling(Profiler())
+    try:
+        for _ in range(2):
+            PromptValidator.clear_memos()
+            PromptValidator.analyze('x = "ok"').as_dict()
+            PromptValidator.clear_memos()
+    finally:
+        profiler.uninstall()
+    lookups = profiler.stages["VerdictCache.get_key"]
+    assert (lookups.calls, lookups.hits, lookups.misses) == (2, 1, 1)
+    assert profiler.stages["VerdictCache.put_key"].calls >= 1
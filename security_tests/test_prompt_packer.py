@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Testes do Empacotamento por Orçamento de Tokens
+Todo trecho cabe no orçamento, inclusive quando uma única linha não cabe,
+e os trechos juntos reproduzem o documento
+"""
+
+import pytest
+
+from prompt_packer import chunk_document, estimate_tokens
+
+LONG_LINE = '  user_data = "' + "echo abcdefgh/ " * 1000 + '"\n'
+DOCUMENT = 'resource "aws_instance" "web" {\n' + LONG_LINE + '  ami = "ami-123"\n}\n'
+
+
+@pytest.mark.parametrize("budget", [1, 7, 500])
+def test_overlong_line_is_split_within_budget(budget):
+    assert estimate_tokens(LONG_LINE) > budget
+    chunks = chunk_document("pr-1", DOCUMENT, budget)
+    assert all(chunk.tokens <= budget for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == DOCUMENT
+    assert all(DOCUMENT[chunk.start:chunk.end] == chunk.text for chunk in chunks)
+    assert {chunk.addresses for chunk in chunks} == {("aws_instance.web",)}
+
+
+def test_cuts_keep_the_token_estimate():
+    chunks = chunk_document("pr-1", DOCUMENT, 500)
+    assert sum(chunk.tokens for chunk in chunks) == estimate_tokens(DOCUMENT)
+
+
+def test_small_document_is_one_chunk():
+    chunks = chunk_document("pr-1", DOCUMENT, estimate_tokens(DOCUMENT))
+    assert [chunk.text for chunk in chunks] == [DOCUMENT]
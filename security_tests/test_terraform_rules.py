@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Testes das Regras de Misconfiguração Terraform
+Cada regra dispara no exemplo inseguro ou em um trecho mínimo, o exemplo
+seguro passa limpo e nomes que só se referem a segredos não viram
+credencial hardcoded (que bloqueia sem consultar o modelo)
+"""
+
+import os
+
+import pytest
+
+from terraform_rules import RULES, blocking, is_secret_name
+from test_prompt_injection import PromptValidator
+from tiered_pipeline import classify
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "terraform_examples")
+
+
+def example(name: str) -> str:
+    with open(os.path.join(EXAMPLES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def rule_ids(code: str):
+    return {finding.rule_id for finding in RULES.evaluate(code)}
+
+
+def test_insecure_example_findings():
+    findings = {(f.rule_id, f.address) for f in RULES.evaluate(example("exemplo_inseguro.tf"))}
+    assert {
+        ("TF-SEC-001", "aws_rds_instance.database"),
+        ("TF-SEC-002", "output.db_connection_string"),
+        ("TF-VAR-001", "variable.db_password"),
+        ("TF-VAR-002", "variable.api_key"),
+        ("TF-OUT-001", "output.db_password"),
+        ("TF-RDS-001", "aws_rds_instance.database"),
+        ("TF-RDS-002", "aws_rds_instance.database"),
+        ("TF-RDS-003", "aws_rds_instance.database"),
+        ("TF-RDS-004", "aws_rds_instance.database"),
+        ("TF-SG-001", "aws_security_group.app"),
+        ("TF-S3-001", "aws_s3_bucket_acl.data"),
+        ("TF-S3-003", "aws_s3_bucket_server_side_encryption_configuration.data"),
+    } <= findings
+
+
+def test_secure_example_is_clean():
+    assert RULES.evaluate(example("exemplo_seguro.tf")) == []
+
+
+# Regras sem exemplo em terraform_examples/: trecho mínimo que dispara cada uma
+SNIPPETS = {
+    "TF-SG-002": '''resource "aws_security_group" "web" {
+  ingress {
+    from_port   = 443
+    to_port     = 443
+    protocol    = "tcp"
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+}''',
+    "TF-S3-002": '''resource "aws_s3_bucket_public_access_block" "b" {
+  block_public_acls = false
+}''',
+    "TF-EBS-001": '''resource "aws_ebs_volume" "v" {
+  size = 10
+}''',
+    "TF-EC2-001": '''resource "aws_instance" "web" {
+  associate_public_ip_address = true
+}''',
+}
+
+
+@pytest.mark.parametrize("rule_id", sorted(SNIPPETS))
+def test_rule_snippets(rule_id):
+    assert rule_id in rule_ids(SNIPPETS[rule_id])
+
+
+def test_every_rule_is_covered():
+    covered = rule_ids(example("exemplo_inseguro.tf")) | set(SNIPPETS)
+    assert {rule.rule_id for rule in RULES} <= covered
+
+
+@pytest.mark.parametrize("name", ["password", "master_password", "db_password", "client_secret",
+                                  "auth_token", "secret_key", "access_key", "api_key",
+                                  "private_key", "secret_string"])
+def test_secret_names(name):
+    assert is_secret_name(name)
+
+
+@pytest.mark.parametrize("name", ["secret_name", "password_secret_arn", "token_ttl", "password_length",
+                                  "kms_key_id", "secret_id", "token_name", "passwordless"])
+def test_names_that_only_refer_to_secrets(name):
+    assert not is_secret_name(name)
+
+
+@pytest.mark.parametrize("attribute", [
+    'secret_name = "prod/db"',
+    'password_secret_arn = "arn:aws:secretsmanager:us-east-1:123:secret:db"',
+    'token_ttl = "3600"',
+    'password_length = "32"',
+])
+def test_secret_references_are_not_hardcoded(attribute):
+    code = f'resource "aws_db_instance" "d" {{\n  {attribute}\n  storage_encrypted = true\n}}\n'
+    findings = RULES.evaluate(code)
+    assert not blocking(findings)
+    blocked, _ = classify(PromptValidator.analyze(code), findings)
+    assert blocked is False
+
+
+def test_output_reading_a_secret():
+    code = 'output "db" {\n  value = aws_db_instance.main.password\n}\n'
+    assert "TF-OUT-001" in rule_ids(code)
+    assert "TF-OUT-001" not in rule_ids(code.replace("}\n", "  sensitive = true\n}\n"))
+    assert "TF-OUT-001" not in rule_ids('output "arn" {\n  value = aws_secretsmanager_secret.db.arn\n}\n')
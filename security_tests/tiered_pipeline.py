@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Pipeline em Camadas (pré-filtro antes do modelo)
+Camada 0: conteúdo idêntico a um já avaliado reutiliza o veredicto
+Camada 1: detectores determinísticos e regras de misconfiguração decidem
+os casos evidentes
+Camada 2: apenas payloads ambíguos são enviados ao modelo (V3)
+Registra latência por camada e taxa de escalonamento
+"""
+
+import argparse
+import asyncio
+import hashlib
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from llm_client import AsyncLLMValidator
+from terraform_rules import RULES, Finding, blocking
+from test_prompt_injection import PromptValidator
+from verdict_cache import VerdictCache
+
+TIER_CACHE = "cache"
+TIER_DETERMINISTIC = "deterministic"
+TIER_MODEL = "model"
+TIERS = [TIER_CACHE, TIER_DETERMINISTIC, TIER_MODEL]
+
+
+@dataclass(frozen=True)
+class TierDecision:
+    """Decisão final para um payload e a camada que a tomou"""
+    item_id: str
+    blocked: bool
+    tier: str
+    reason: str
+
+
+def evident_injection(verdict: Dict) -> Optional[str]:
+    """Motivo do bloqueio quando os detectores já decidem sozinhos (None caso contrário)"""
+    if verdict["keywords"] or verdict["encoded_keywords"]:
+        found = (verdict["keywords"] + verdict["encoded_keywords"])[:3]
+        return f"Injeção evidente: {', '.join(found)}"
+    return None
+
+
+def classify(verdict: Dict, findings: Iterable[Finding] = ()) -> Tuple[Optional[bool], str]:
+    """Decide pelos detectores e regras: True bloqueia, False aprova, None é ambíguo"""
+    reason = evident_injection(verdict)
+    if reason is not None:
+        return True, reason
+    critical = blocking(findings)
+    if critical:
+        found = [f"{f.title} ({f.address})" for f in critical[:3]]
+        return True, f"Misconfiguração crítica: {'; '.join(found)}"
+    if verdict["encoding"] or verdict["confusion"] or verdict["anomalies"]:
+        signals = [s for s in (verdict["encoding"], verdict["confusion"]) if s]
+        if verdict["anomalies"]:
+            signals.append("entropia alta")
+        return None, f"Sinais fracos: {', '.join(signals)}"
+    return False, "Nenhum sinal nos detectores determinísticos"
+
+
+class TieredPipeline:
+    """Encadeia cache, detectores e modelo, registrando métricas por camada"""
+
+    def __init__(self, validator_factory=None, version: str = "V3",
+                 cache: Optional[VerdictCache] = None):
+        # validator_factory() -> AsyncLLMValidator (um novo por lote: o pool é
+        # fechado ao fim de validate_many)
+        self.validator_factory = validator_factory
+        self.version = version
+        self.cache = cache if cache is not None else VerdictCache()
+        self.latencies: Dict[str, List[float]] = {tier: [] for tier in TIERS}
+        self.decisions: Dict[str, int] = {tier: 0 for tier in TIERS}
+
+    def _cache_version(self) -> str:
+        rules = hashlib.sha256(repr(RULES.signature()).encode()).hexdigest()[:8]
+        return f"tiered-{self.version}-{PromptValidator.config_version()}-{rules}"
+
+    def _record(self, tier: str, elapsed: float, decided: bool = True) -> None:
+        # Cada decisão registra a latência total na camada que decidiu; itens
+        # escalonados também deixam o tempo da camada 1 nas amostras dela
+        self.latencies[tier].append(elapsed)
+        if decided:
+            self.decisions[tier] += 1
+
+    async def evaluate_many(self, items: Iterable[Tuple[str, str]]) -> List[TierDecision]:
+        """Avalia pares (id, payload); a ordem de saída é a de entrada"""
+        items = list(items)
+        decisions: List[Optional[TierDecision]] = [None] * len(items)
+        escalate: List[int] = []
+        tier1: Dict[int, float] = {}
+        version = self._cache_version()
+
+        for index, (item_id, payload) in enumerate(items):
+            start = time.perf_counter()
+            cached = self.cache.get(payload, version)
+            if cached is not None:
+                decisions[index] = TierDecision(item_id, cached["blocked"], TIER_CACHE, cached["reason"])
+                self._record(TIER_CACHE, time.perf_counter() - start)
+                continue
+
+            # As regras só rodam se os detectores não bloquearam sozinhos
+            verdict = PromptValidator.analyze(payload)
+            reason = evident_injection(verdict)
+            if reason is not None:
+                blocked = True
+            else:
+                blocked, reason = classify(verdict, RULES.evaluate(payload))
+            if blocked is None:
+                escalate.append(index)
+                tier1[index] = time.perf_counter() - start
+                self._record(TIER_DETERMINISTIC, tier1[index], decided=False)
+                continue
+            decisions[index] = TierDecision(item_id, blocked, TIER_DETERMINISTIC, reason)
+            self.cache.put(payload, version, {"blocked": blocked, "reason": reason})
+            self._record(TIER_DETERMINISTIC, time.perf_counter() - start)
+
+        if escalate:
+            start = time.perf_counter()
+            if self.validator_factory is None:
+                # Sem modelo disponível: postura conservadora
+                results = [None] * len(escalate)
+            else:
+                validator: AsyncLLMValidator = self.validator_factory()
+                results = await validator.validate_many(
+                    [(items[i][0], self.version, items[i][1]) for i in escalate]
+                )
+            per_item = (time.perf_counter() - start) / len(escalate)
+            for index, result in zip(escalate, results):
+                item_id, payload = items[index]
+                if result is None or result.error:
+                    blocked, reason = True, "Ambíguo e modelo indisponível: bloqueado por precaução"
+                else:
+                    blocked = result.verdict.blocked
+                    reason = f"Modelo: {result.verdict.classification}"
+                decisions[index] = TierDecision(item_id, blocked, TIER_MODEL, reason)
+                if result is not None and not result.error:
+                    self.cache.put(payload, version, {"blocked": blocked, "reason": reason})
+                model = result.latency if result is not None else per_item
+                self._record(TIER_MODEL, tier1[index] + model)
+
+        return decisions
+
+    def run(self, items: Iterable[Tuple[str, str]]) -> List[TierDecision]:
+        """Atalho síncrono para evaluate_many"""
+        return asyncio.run(self.evaluate_many(items))
+
+    def stats(self) -> Dict:
+        """Latência p50/p99 por camada e taxa de escalonamento ao modelo"""
+        total = sum(self.decisions.values())
+        tiers = {}
+        for tier, samples in self.latencies.items():
+            ordered = sorted(samples)
+            tiers[tier] = {
+                "count": self.decisions[tier],
+                "p50_ms": statistics.median(ordered) * 1000 if ordered else 0,
+                "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000 if ordered else 0,
+            }
+        return {
+            "total": total,
+            "escalation_rate": (self.decisions[TIER_MODEL] / total * 100) if total > 0 else 0,
+            "tiers": tiers,
+        }
+
+
+def main() -> int:
+    from test_prompt_injection import TEST_CASES, load_test_cases
+
+    parser = argparse.ArgumentParser(description="Pipeline em camadas com pré-filtro determinístico")
+    parser.add_argument("--endpoint", help="URL do modelo (padrão: stub local)")
+    parser.add_argument("--corpus", help="Corpus JSONL no lugar de TEST_CASES")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=1, help="Reenvia o mesmo lote N vezes (exercita o cache)")
+    args = parser.parse_args()
+
+    cases = list(load_test_cases(args.corpus) if args.corpus else TEST_CASES)
+    items = [(case.id, case.payload) for case in cases]
+
+    def run(endpoint: str) -> List[TierDecision]:
+        pipeline = TieredPipeline(lambda: AsyncLLMValidator(endpoint, concurrency=args.concurrency))
+        decisions = []
+        for _ in range(args.repeat):
+            decisions = pipeline.run(items)
+        for decision in decisions:
+            status = "BLOQUEADO" if decision.blocked else "APROVADO"
+            print(f"{decision.item_id:20s} {status:10s} [{decision.tier}] {decision.reason}")
+        summary = pipeline.stats()
+        print(f"\nEscalonamento ao modelo: {summary['escalation_rate']:.1f}% de {summary['total']} decisões")
+        for tier, stat in summary["tiers"].items():
+            print(f"  {tier:14s} {stat['count']:6d}  p50={stat['p50_ms']:.3f}ms  p99={stat['p99_ms']:.3f}ms")
+        return decisions
+
+    if args.endpoint:
+        run(args.endpoint)
+    else:
+        from llm_stub_server import StubServer
+        with StubServer() as server:
+            run(server.url)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
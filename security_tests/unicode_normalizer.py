@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Normalização Unicode
+Converte o texto para uma forma canônica antes dos detectores: NFKC/NFKD
+(fullwidth, ligaduras), remoção de marcas combinantes e caracteres de
+largura zero, e troca de homóglifos (cirílico/grego) por letras latinas.
+Mantém um mapa de offsets para o texto original. Payloads só com ASCII,
+a grande maioria, passam direto sem custo
+"""
+
+import hashlib
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from typing import Dict, Optional, Tuple
+
+from pattern_registry import Span
+
+# Homóglifos que a NFKC não resolve (subconjunto de confusables.txt do Unicode)
+CONFUSABLES: Dict[str, str] = {
+    # Cirílico maiúsculo
+    "А": "A", "В": "B", "Е": "E", "Ѕ": "S", "І": "I", "Ј": "J", "К": "K", "М": "M",
+    "Н": "H", "О": "O", "Р": "P", "С": "C", "Т": "T", "У": "Y", "Х": "X", "Ү": "Y",
+    "Ԁ": "D", "Ԍ": "G", "Ԛ": "Q", "Ԝ": "W", "Ӏ": "I",
+    # Cirílico minúsculo
+    "а": "a", "в": "b", "е": "e", "ѕ": "s", "і": "i", "ј": "j", "к": "k", "м": "m",
+    "н": "h", "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "ү": "y",
+    "ԁ": "d", "ԛ": "q", "ԝ": "w", "һ": "h", "ӏ": "l",
+    # Grego
+    "Α": "A", "Β": "B", "Ε": "E", "Ζ": "Z", "Η": "H", "Ι": "I", "Κ": "K", "Μ": "M",
+    "Ν": "N", "Ο": "O", "Ρ": "P", "Τ": "T", "Υ": "Y", "Χ": "X",
+    "α": "a", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+    # Latinos e símbolos parecidos
+    "ı": "i", "ȷ": "j", "ℓ": "l", "ꓲ": "I", "ǀ": "l", "∕": "/", "ː": ":", "׃": ":",
+    "։": ":", "∶": ":", "꞉": ":",
+}
+
+# Caracteres de formatação invisíveis (removidos além da categoria Cf)
+ZERO_WIDTH = {"\u200b", "\u200c", "\u200d", "\u2060", "\ufeff", "\u00ad", "\u180e"}
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+
+class NormalizedText:
+    """Texto canônico e o mapa de offsets de volta ao original"""
+
+    __slots__ = ("text", "original", "_marks", "_origins", "_folded")
+
+    def __init__(self, text: str, original: str, marks: Optional[array] = None,
+                 origins: Optional[array] = None, folded: Optional[array] = None):
+        self.text = text
+        self.original = original
+        # Segmentos a partir de marks[k] (posição normalizada): trechos copiados
+        # avançam junto com origins[k]; caracteres dobrados apontam todos para
+        # origins[k]. Sem segmentos, o mapa é a identidade
+        self._marks = marks
+        self._origins = origins
+        self._folded = folded
+
+    @property
+    def changed(self) -> bool:
+        return self._marks is not None
+
+    def to_original(self, position: int) -> int:
+        """Offset no original de uma posição do texto normalizado"""
+        if self._marks is None:
+            return position
+        if position >= len(self.text):
+            return len(self.original)
+        k = bisect_right(self._marks, position) - 1
+        if self._folded[k]:
+            return self._origins[k]
+        return self._origins[k] + position - self._marks[k]
+
+    def span_to_original(self, span: Span) -> Span:
+        """Converte um span (fim exclusivo) para offsets do original"""
+        start, end = span
+        if self._marks is None:
+            return start, end
+        if end <= start:
+            origin = self.to_original(start)
+            return origin, origin
+        return self.to_original(start), self.to_original(end - 1) + 1
+
+
+class UnicodeNormalizer:
+    """Normalizador com tabela por caractere memoizada"""
+
+    def __init__(self, confusables: Optional[Dict[str, str]] = None):
+        self.confusables = dict(CONFUSABLES if confusables is None else confusables)
+        self._memo: Dict[str, str] = {}
+        # Hash da tabela e da versão Unicode (entra na versão de configuração do cache)
+        material = repr(sorted(self.confusables.items())) + unicodedata.unidata_version
+        self.signature = hashlib.sha256(material.encode()).hexdigest()[:16]
+
+    def fold_char(self, ch: str) -> str:
+        """Forma canônica de um caractere (pode ser vazia ou ter vários caracteres)"""
+        folded = self._memo.get(ch)
+        if folded is not None:
+            return folded
+        if ch in ZERO_WIDTH or unicodedata.category(ch) == "Cf":
+            folded = ""
+        else:
+            parts = []
+            for part in unicodedata.normalize("NFKD", ch):
+                if unicodedata.combining(part):
+                    continue
+                parts.append(self.confusables.get(part, part))
+            folded = unicodedata.normalize("NFKC", "".join(parts))
+        self._memo[ch] = folded
+        return folded
+
+    def normalize(self, text: str) -> NormalizedText:
+        """Normaliza o texto; ASCII puro é devolvido sem cópia"""
+        if text.isascii():
+            return NormalizedText(text, text)
+
+        parts = []
+        marks, origins, folded_marks = array("L"), array("L"), array("b")
+        size = 0
+        changed = False
+        fold = self.fold_char
+        position = 0
+        # Só os trechos não-ASCII passam pela tabela; o resto é copiado em fatias
+        for run in _NON_ASCII.finditer(text):
+            start, end = run.span()
+            if start > position:
+                parts.append(text[position:start])
+                marks.append(size)
+                origins.append(position)
+                folded_marks.append(0)
+                size += start - position
+            for i in range(start, end):
+                ch = text[i]
+                folded = fold(ch)
+                if folded != ch:
+                    changed = True
+                if folded:
+                    parts.append(folded)
+                    marks.append(size)
+                    origins.append(i)
+                    folded_marks.append(1)
+                    size += len(folded)
+            position = end
+        if not changed:
+            return NormalizedText(text, text)
+        if position < len(text):
+            parts.append(text[position:])
+            marks.append(size)
+            origins.append(position)
+            folded_marks.append(0)
+        return NormalizedText("".join(parts), text, marks, origins, folded_marks)
+
+
+def normalize(text: str) -> Tuple[str, NormalizedText]:
+    """Atalho com o normalizador padrão: (texto canônico, mapa)"""
+    result = NORMALIZER.normalize(text)
+    return result.text, result
+
+
+NORMALIZER = UnicodeNormalizer()
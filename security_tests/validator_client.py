@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Cliente do Daemon de Validação
+Envia documentos no formato de pr_samples (ou arquivos .tf) ao
+validator_daemon e imprime o veredicto. Usa apenas a biblioteca padrão e
+não importa os detectores, para iniciar rápido em jobs de CI
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import sys
+from typing import Dict, Optional
+
+EXIT_APPROVED = 0
+EXIT_BLOCKED = 1
+EXIT_ERROR = 2
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection sobre um socket Unix"""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class ValidatorClient:
+    """Conexão keep-alive reutilizada entre documentos"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8766,
+                 unix_socket: Optional[str] = None, timeout: float = 30.0):
+        if unix_socket:
+            self.conn = UnixHTTPConnection(unix_socket, timeout)
+        else:
+            self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        self.conn.request(method, path, body=data, headers=headers)
+        response = self.conn.getresponse()
+        payload = json.loads(response.read() or b"{}")
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {payload.get('error', '')}")
+        return payload
+
+    def validate(self, document: Dict) -> Dict:
+        return self._request("POST", "/validate", document)
+
+    def stats(self) -> Dict:
+        return self._request("GET", "/stats")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def load_document(path: str) -> Dict:
+    """Lê um documento JSON de PR; outros arquivos viram {'code_snippet': ...}"""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        text = f.read()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    try:
+        document = json.loads(text)
+    except ValueError:
+        document = None
+    if isinstance(document, dict):
+        return document
+    return {"id": path, "code_snippet": text}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Valida PRs no daemon de validação")
+    parser.add_argument("files", nargs="+", help="Documentos JSON de PR ou arquivos .tf ('-' = stdin)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--unix", metavar="PATH", help="Socket Unix do daemon")
+    parser.add_argument("--versions", nargs="*", help="Versões de prompt (padrão: V2 V3)")
+    parser.add_argument("--json", action="store_true", help="Imprime a resposta completa em JSON")
+    args = parser.parse_args()
+
+    client = ValidatorClient(args.host, args.port, args.unix)
+    status = EXIT_APPROVED
+    try:
+        for path in args.files:
+            document = load_document(path)
+            if args.versions:
+                document["versions"] = args.versions
+            verdict = client.validate(document)
+            if args.json:
+                print(json.dumps(verdict, ensure_ascii=False))
+            else:
+                label = "BLOQUEADO" if verdict["blocked"] else "APROVADO"
+                reason = list(verdict["versions"].values())[-1]["explanation"]
+                print(f"{verdict['id'] or path}: {label} ({verdict['elapsed_ms']:.2f}ms) {reason}")
+            if verdict["blocked"]:
+                status = EXIT_BLOCKED
+    except (OSError, RuntimeError) as e:
+        print(f"Erro ao consultar o daemon: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        client.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Daemon de Validação
+Carrega detectores, autômato e cache uma única vez e atende pedidos de
+validação por HTTP em localhost ou em um socket Unix. Cada conexão é
+tratada em uma thread; a análise roda sob uma trava no próprio processo
+ou em um pool de processos já aquecidos (--workers)
+"""
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence
+
+from pr_documents import document_payload, parse_versions
+from test_prompt_injection import PromptValidator, _init_worker
+from verdict_cache import VerdictCache
+
+MAX_BODY = 16 << 20
+
+
+def review_payload(payload: str, versions: Sequence[str]) -> Dict:
+    """Executado no worker: só o veredicto volta ao processo principal"""
+    return PromptValidator.review(payload, versions)
+
+
+def _warm_up() -> None:
+    """Compila o autômato e os padrões antes do primeiro pedido"""
+    PromptValidator.keyword_matcher()
+    PromptValidator.review('resource "null_resource" "warm_up" {}')
+
+
+def _init_daemon_worker(cache_path: Optional[str], cache_enabled: bool) -> None:
+    _init_worker(cache_path, cache_enabled)
+    _warm_up()
+
+
+class AnalysisError(RuntimeError):
+    """Falha ao analisar um documento válido (worker morto, erro interno): vira 500"""
+
+
+class ValidatorService:
+    """Estado aquecido compartilhado pelas threads do servidor"""
+
+    def __init__(self, workers: int = 0, cache_db: Optional[str] = None, cache: bool = True):
+        self.started = time.time()
+        self.requests = 0
+        self.blocked = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_args = (workers, cache_db, cache)
+
+        if not cache:
+            PromptValidator.CACHE = None
+        elif cache_db:
+            PromptValidator.CACHE = VerdictCache(path=cache_db)
+        if workers > 0:
+            self._pool = self._new_pool()
+            # Sobe e aquece todos os workers agora, não no primeiro PR
+            for future in [self._pool.submit(_warm_up) for _ in range(workers)]:
+                future.result()
+        else:
+            _warm_up()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        workers, cache_db, cache = self._pool_args
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_daemon_worker,
+                                   initargs=(cache_db, cache))
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor) -> None:
+        # Um worker morto quebra o pool inteiro; o próximo pedido usa um novo
+        with self._lock:
+            if self._pool is broken:
+                self._pool = self._new_pool()
+        broken.shutdown(wait=False)
+
+    def validate(self, document: Dict) -> Dict:
+        """Valida um documento e retorna a resposta JSON"""
+        start = time.perf_counter()
+        item_id, payload = document_payload(document)
+        versions = parse_versions(document.get("versions"))
+
+        pool = self._pool
+        try:
+            if pool is not None:
+                result = pool.submit(review_payload, payload, versions).result()
+            else:
+                # O estado do PromptValidator (memos, cache SQLite) não é thread-safe
+                with self._lock:
+                    result = review_payload(payload, versions)
+        except BrokenExecutor as e:
+            self._replace_broken_pool(pool)
+            raise AnalysisError(f"worker de análise encerrado: {e}") from e
+        except Exception as e:
+            raise AnalysisError(f"falha na análise: {e}") from e
+
+        with self._lock:
+            self.requests += 1
+            self.blocked += 1 if result["blocked"] else 0
+        return {"id": item_id, **result, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                "uptime_s": time.time() - self.started,
+                "requests": self.requests,
+                "blocked": self.blocked,
+                "errors": self.errors,
+                "workers": self._pool._max_workers if self._pool is not None else 0,
+            }
+            if self._pool is None and PromptValidator.CACHE is not None:
+                stats["cache"] = PromptValidator.CACHE.stats()
+        return stats
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+class ValidatorHandler(BaseHTTPRequestHandler):
+    """POST /validate, GET /health e GET /stats"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "PromptValidatorDaemon/1.0"
+
+    @property
+    def service(self) -> ValidatorService:
+        return self.server.service
+
+    def _send(self, status: int, body: Dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send(200, self.service.stats())
+        else:
+            self._send(404, {"error": f"rota desconhecida: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != "/validate":
+            self._send(404, {"error": f"rota desconhecida: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.service.record_error()
+            self._send(400, {"error": "Content-Length inválido"})
+            self.close_connection = True
+            return
+        if length > MAX_BODY:
+            self.service.record_error()
+            self._send(413, {"error": "documento grande demais"})
+            self.close_connection = True
+            return
+        try:
+            document = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(document, dict):
+                raise ValueError("O corpo deve ser um objeto JSON")
+            self._send(200, self.service.validate(document))
+        except AnalysisError as e:
+            self.service.record_error()
+            self._send(500, {"error": str(e)})
+        except ValueError as e:
+            self.service.record_error()
+            self._send(400, {"error": str(e)})
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            sys.stderr.write(f"[daemon] {format % args}\n")
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor HTTP em socket Unix (uma thread por conexão)"""
+
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler espera um endereço (host, porta)
+        return request, ("unix", 0)
+
+
+def make_server(service: ValidatorService, host: str = "127.0.0.1", port: int = 8766,
+                unix_socket: Optional[str] = None, quiet: bool = False) -> socketserver.BaseServer:
+    """Cria o servidor HTTP (TCP em localhost ou socket Unix)"""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = UnixHTTPServer(unix_socket, ValidatorHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ValidatorHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Daemon de validação de prompt injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--unix", metavar="PATH", help="Escuta em um socket Unix em vez de TCP")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Processos de análise (0 = na própria thread, sob trava)")
+    parser.add_argument("--cache-db", metavar="PATH", help="Cache de veredictos em SQLite")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--quiet", action="store_true", help="Não registra cada requisição")
+    args = parser.parse_args()
+
+    service = ValidatorService(args.workers, args.cache_db, not args.no_cache)
+    server = make_server(service, args.host, args.port, args.unix, args.quiet)
+    where = f"unix:{args.unix}" if args.unix else f"http://{args.host}:{server.server_address[1]}"
+    print(f"Daemon de validação em {where} (Ctrl+C para encerrar)", file=sys.stderr)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM (systemd, docker stop) encerra como Ctrl+C e remove o socket
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
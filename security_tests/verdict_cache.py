@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Cache de Veredictos por Hash de Conteúdo
+LRU em memória com backend SQLite opcional para compartilhar resultados
+entre execuções de CI
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def content_key(payload: str, config_version: str) -> str:
+    """Chave do cache: hash do payload + versão da configuração dos detectores"""
+    digest = hashlib.sha256(payload.encode("utf-8", "surrogatepass")).hexdigest()
+    return f"{config_version}:{digest}"
+
+
+class VerdictCache:
+    """Cache LRU de veredictos com contadores de hit/miss/eviction"""
+
+    def __init__(self, maxsize: int = 4096, path: Optional[str] = None,
+                 max_disk_entries: int = 1_000_000):
+        self.maxsize = maxsize
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self._puts_since_trim = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open_db(path)
+
+    def _open_db(self, path: str) -> None:
+        """Abre (ou cria) o backend SQLite compartilhado"""
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY,"
+            " version TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_used_at ON verdicts(used_at)")
+        self._db.commit()
+
+    def _check_version(self, version: str) -> None:
+        """Descarta entradas em memória de uma configuração anterior"""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, payload: str, config_version: str) -> Optional[Any]:
+        """Retorna o veredicto em cache ou None"""
+        return self.get_key(content_key(payload, config_version), config_version)
+
+    def get_key(self, key: str, config_version: str) -> Optional[Any]:
+        """Como get(), com a chave já calculada por content_key"""
+        with self._lock:
+            self._check_version(config_version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM verdicts WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._db.execute(
+                        "UPDATE verdicts SET used_at = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self._db.commit()
+                    self._store(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, payload: str, config_version: str, value: Any) -> None:
+        """Armazena um veredicto (precisa ser serializável em JSON se houver disco)"""
+        self.put_key(content_key(payload, config_version), config_version, value)
+
+    def put_key(self, key: str, config_version: str, value: Any) -> None:
+        """Como put(), com a chave já calculada por content_key"""
+        with self._lock:
+            self._check_version(config_version)
+            self._store(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO verdicts (key, version, value, used_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, config_version, json.dumps(value), time.time()),
+                )
+                self._trim_db()
+                self._db.commit()
+
+    def _store(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _trim_db(self) -> None:
+        """Mantém o backend em disco dentro do limite de entradas"""
+        # COUNT(*) percorre a tabela; verifica apenas a cada 1000 inserções
+        self._puts_since_trim += 1
+        if self._puts_since_trim < 1000:
+            return
+        self._puts_since_trim = 0
+        (count,) = self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM verdicts WHERE key IN"
+                " (SELECT key FROM verdicts ORDER BY used_at LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def clear(self) -> None:
+        """Esvazia o cache (memória e disco) e zera os contadores"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM verdicts")
+                self._db.commit()
+            self.hits = self.misses = self.evictions = self.disk_hits = 0
+
+    def close(self) -> None:
+        """Fecha o backend em disco"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_hits": self.disk_hits,
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0,
+        }